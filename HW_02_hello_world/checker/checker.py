@@ -36,3 +36,6 @@ class Checker:
     def check_str_buf(self):
         self.open_sysfs_files()
         return self.tests.str_buf_tests()
+
+    def check_sweep(self):
+        return self.tests.sweep_tests()
@@ -1,5 +1,7 @@
 from module_ops import ModuleOps
 
+EINVAL = "[Errno 22] Invalid argument"
+
 class Executor:
     def __init__(self, ops):
         self.ops = ops
@@ -18,12 +20,35 @@ class Executor:
 
     def str_buf_exec_test(self, case):
         _str = case['write']
-        for idx in range (0, 13):
-            self.ops.write_idx(str(idx))
-            self.ops.write_ch_val(" ")
-        for idx in range (0, len(_str)):
-            self.ops.write_idx(str(idx))
-            self.ops.write_ch_val(_str[idx])
+        # Хвост предыдущей строки (до 13 символов) затирается пробелами
+        writes = self.ops.writes
+        self.ops.write_str(_str.ljust(13))
+        writes = self.ops.writes - writes
         str_buf = self.ops.read_str_buf()
-        print(f"str_buf_test: записано {case['write']}, прочитано {str_buf}, ожидалось {case['expected']}")
+        print(f"str_buf_test: записано {case['write']} ({writes} записей), прочитано {str_buf}, ожидалось {case['expected']}")
         return str_buf.strip() == case['expected']
+
+    def sweep_exec_test(self, idx, valid, invalid, model):
+        """Один раунд: idx, затем все символы valid и invalid; my_str читается один раз"""
+        errors = []
+        err = self.ops.pwrite_idx(idx)
+        if err:
+            errors.append(f"idx {idx}: {err}")
+        for ch in valid:
+            err = self.ops.pwrite_ch_val(bytes([ch]))
+            if err:
+                errors.append(f"idx {idx}, ch_val {ch}: {err}")
+            else:
+                model[idx] = ch
+        for ch in invalid:
+            err = self.ops.pwrite_ch_val(bytes([ch]))
+            if err != EINVAL:
+                errors.append(f"idx {idx}, ch_val {ch}: получено {err}, ожидалось {EINVAL}")
+        # Модель знает my_str до первого нуля
+        known = bytes(model).split(b"\0")[0]
+        str_buf = self.ops.read_str_buf().rstrip("\n").encode()
+        if str_buf[:len(known)] != known:
+            errors.append(f"idx {idx}: my_str {str_buf[:len(known)]}, ожидалось {known}")
+        for error in errors:
+            print(f"sweep_test: {error}")
+        return not errors
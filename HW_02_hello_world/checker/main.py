@@ -5,10 +5,14 @@ from checker import Checker
 
 parser = argparse.ArgumentParser(description='Проверка параметров модуля ядра.')
 parser.add_argument('module_name', type=str, help='Имя модуля для проверки')
+parser.add_argument('--sweep', action='store_true', help='Перебор всех idx и символов ch_val')
 args = parser.parse_args()
 
 checker = Checker(args.module_name)
 
-print("Проверка str_buf:", checker.check_str_buf())
-print("Проверка ch_val:", checker.check_ch_val())
-print("Проверка idx:", checker.check_idx())
+if args.sweep:
+    print("Проверка sweep:", checker.check_sweep())
+else:
+    print("Проверка str_buf:", checker.check_str_buf())
+    print("Проверка ch_val:", checker.check_ch_val())
+    print("Проверка idx:", checker.check_idx())
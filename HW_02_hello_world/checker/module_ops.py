@@ -1,3 +1,4 @@
+import os
 import sys
 
 class ModuleOps:
@@ -5,8 +6,14 @@ class ModuleOps:
         self.idx_file = idx_file
         self.ch_val_file = ch_val_file
         self.str_buf_file = str_buf_file
+        # Что записано в модуль: idx и my_str по последнему чтению (None - неизвестно)
+        self.cur_idx = None
+        self.str_cache = None
+        # Число системных вызовов write() в sysfs
+        self.writes = 0
 
     def write_idx(self, value:str):
+        self.cur_idx = None
         try:
             self.idx_file.seek(0)
             self.idx_file.write(value)
@@ -15,6 +22,7 @@ class ModuleOps:
             return str(e)
 
     def write_ch_val(self, value:str):
+        self.str_cache = None
         try:
             val_str = str(value)
             self.ch_val_file.seek(0)
@@ -22,7 +30,7 @@ class ModuleOps:
             self.ch_val_file.flush()
         except Exception as e:
             return str(e)
-            
+
     def read_idx(self):
         try:
             self.idx_file.seek(0)
@@ -41,4 +49,43 @@ class ModuleOps:
     def read_str_buf(self):
         self.str_buf_file.seek(0)
         str_buf = self.str_buf_file.read()
+        # my_str читается до первого нуля, дальше содержимое неизвестно
+        self.str_cache = str_buf.rstrip("\n")
         return str_buf
+
+    def pwrite_idx(self, idx:int):
+        """Запись idx без буферизации, пропускается если модуль уже его хранит"""
+        if idx == self.cur_idx:
+            return
+        self.cur_idx = None
+        try:
+            self.writes += 1
+            os.pwrite(self.idx_file.fileno(), b"%d" % idx, 0)
+        except OSError as e:
+            return str(e)
+        self.cur_idx = idx
+
+    def pwrite_ch_val(self, ch:bytes):
+        self.str_cache = None
+        try:
+            self.writes += 1
+            os.pwrite(self.ch_val_file.fileno(), ch, 0)
+        except OSError as e:
+            return str(e)
+
+    def write_str(self, value:str):
+        """Записать строку с позиции 0, меняя только отличающиеся символы"""
+        if self.str_cache is None:
+            self.read_str_buf()
+        cache = self.str_cache
+        for idx, ch in enumerate(value):
+            if idx < len(cache) and cache[idx] == ch:
+                continue
+            err = self.pwrite_idx(idx) or self.pwrite_ch_val(ch.encode())
+            if err:
+                self.str_cache = None
+                return err
+        if len(value) >= len(cache):
+            self.str_cache = value
+        else:
+            self.str_cache = value + cache[len(value):]
@@ -1,5 +1,11 @@
+import time
+
 from executor import Executor
 
+MY_STR_SIZE = 256
+PRINTABLE = bytes(range(32, 127))
+CONTROL = bytes(range(0, 32)) + b"\x7f"
+
 class Tests:
     def __init__(self, ops):
         self.exec = Executor(ops)
@@ -43,3 +49,27 @@ class Tests:
             results.append(self.exec.str_buf_exec_test(case))
         print("\nТесты str_buf завершены:", "OK" if all(results) else "FAIL")
         return all(results)
+
+    def sweep_tests(self):
+        ops = self.exec.ops
+        # Начальное содержимое my_str известно до первого нуля
+        model = bytearray(MY_STR_SIZE)
+        initial = ops.read_str_buf().rstrip("\n").encode()
+        model[:len(initial)] = initial
+        print("\n--- Запуск sweep idx/ch_val ---")
+        writes = ops.writes
+        start = time.monotonic()
+        results = []
+        for idx in range(MY_STR_SIZE - 1):
+            # Сдвиг порядка, чтобы в каждой позиции остался свой символ
+            shift = idx % len(PRINTABLE)
+            valid = PRINTABLE[shift:] + PRINTABLE[:shift]
+            invalid = bytes([CONTROL[idx % len(CONTROL)]])
+            results.append(self.exec.sweep_exec_test(idx, valid, invalid, model))
+        # idx за границей буфера (-1 записывается как 4294967295)
+        for idx in (MY_STR_SIZE - 1, MY_STR_SIZE, 1000, -1):
+            results.append(self.exec.sweep_exec_test(idx, b"", b"A", model))
+        writes = ops.writes - writes
+        print(f"sweep: {len(results)} раундов, {writes} записей, {time.monotonic() - start:.2f} с")
+        print("\nТесты sweep завершены:", "OK" if all(results) else "FAIL")
+        return all(results)
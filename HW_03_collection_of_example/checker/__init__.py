@@ -1,25 +1,28 @@
 # Package initialization file
-# Expose main testing components
-from .list_tester import ListModuleTester
-from .queue_tester import QueueModuleTester
-from .rb_tree_tester import RB_TreeModuleTester
-from .bitmap_tester import BitmapModuleTester
-from .bin_search_tester import BSearchModuleTester
-from .bin_tree_tester import Bin_TreeModuleTester
-from .stack_tester import StackModuleTester
-from .brackets_tester import BracketModuleTester
-from .stack2_tester import Stack2ModuleTester
-from .main import main
+# Testing components are imported on first access, so that running one
+# tester does not import all of them
+_TESTERS = {
+    "ListModuleTester": "list",
+    "QueueModuleTester": "queue",
+    "RB_TreeModuleTester": "rb_tree",
+    "BitmapModuleTester": "bitmap",
+    "BSearchModuleTester": "bin_search",
+    "Bin_TreeModuleTester": "bin_tree",
+    "StackModuleTester": "stack",
+    "BracketModuleTester": "brackets",
+    "Stack2ModuleTester": "stack2",
+}
 
-__all__ = [
-    "ListModuleTester",
-    "QueueModuleTester",
-    "RB_TreeModuleTester",
-    "BitmapModuleTester",
-    "BSearchModuleTester",
-    "Bin_TreeModuleTester",
-    "StackModuleTester",
-    "BracketModuleTester",
-    "Stack2ModuleTester",
-    "main",
-]
+__all__ = list(_TESTERS) + ["main"]
+
+
+def __getattr__(name):
+    if name in _TESTERS:
+        from .registry import get_tester
+
+        return get_tester(_TESTERS[name])
+    if name == "main":
+        from .main import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
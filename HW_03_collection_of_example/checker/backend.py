@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import subprocess
+
+from .kmsg import KmsgDemux, KmsgReader
+from .param_writer import ParamWriter
+
+
+def run_command(cmd, check=True, input=None):
+    """Execute command and return its output: a shell line, or an argv list
+    run without a shell so arguments are never interpreted"""
+    result = subprocess.run(
+        cmd,
+        shell=isinstance(cmd, str),
+        check=check,
+        input=input,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+def parse_slabinfo(text):
+    """Bytes held by active objects of every slab cache in /proc/slabinfo"""
+    usage = {}
+    for line in text.splitlines()[2:]:
+        # name active_objs num_objs objsize objperslab pagesperslab : ...
+        fields = line.split()
+        usage[fields[0]] = int(fields[1]) * int(fields[3])
+    return usage
+
+
+class KernelBackend:
+    """Real kernel: modprobe/rmmod, sysfs parameters and /dev/kmsg"""
+
+    name = "kernel"
+
+    def __init__(self):
+        self.writers = {}
+        # Helper already runs as root, no sudo process per call there
+        self.sudo = [] if os.geteuid() == 0 else ["sudo"]
+
+    def module_file(self, module_name):
+        return f"/lib/modules/{os.uname().release}/extra/src/{module_name}.ko"
+
+    def module_installed(self, module_name):
+        return os.path.exists(self.module_file(module_name))
+
+    def module_digest(self, module_name):
+        """sha256 of the installed .ko, what modprobe will load"""
+        with open(self.module_file(module_name), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def load(self, module_name):
+        run_command([*self.sudo, "modprobe", module_name])
+
+    def unload(self, module_name):
+        writer = self.writers.pop(module_name, None)
+        if writer is not None:
+            writer.close()
+        run_command([*self.sudo, "rmmod", module_name])
+
+    def _writer(self, module_name):
+        writer = self.writers.get(module_name)
+        if writer is None:
+            writer = ParamWriter(f"/sys/module/{module_name}/parameters", run_command)
+            self.writers[module_name] = writer
+        return writer
+
+    def set_parameter(self, module_name, param, value):
+        self._writer(module_name).write(param, value)
+
+    def get_parameter(self, module_name, param):
+        """Text of a parameter, read-only ones need no root"""
+        return self._writer(module_name).read(param)
+
+    def slab_usage(self):
+        """Slab cache usage in bytes by cache name, /proc/slabinfo is root only"""
+        return parse_slabinfo(run_command([*self.sudo, "cat", "/proc/slabinfo"]))
+
+    def open_log(self):
+        return KmsgReader()
+
+    def open_demux(self):
+        return KmsgDemux()
+
+
+def get_backend(name, defines=None, helper_socket=None):
+    """Create backend by name ('kernel', 'sim', 'helper' or 'helper-sim')"""
+    if name == "sim":
+        from .simulator import SimulatedBackend
+
+        # Real modules get build time constants from make instead
+        return SimulatedBackend(defines=defines)
+    if name.startswith("helper"):
+        from .helper import HelperBackend
+
+        simulate = name == "helper-sim"
+        return HelperBackend(helper_socket, simulate, defines)
+    return KernelBackend()
+
+
+BACKENDS = ["kernel", "sim", "helper", "helper-sim"]
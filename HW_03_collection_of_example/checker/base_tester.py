@@ -1,12 +1,60 @@
 #!/usr/bin/env python3
 import os
-import time
-import subprocess
 import re
+import time
+from contextlib import contextmanager
+
+from .backend import KernelBackend, run_command
+from .kmsg import LEVELS, LogRing
+
+# Deadline for an expected kernel log record to appear
+ASSERT_TIMEOUT = 2.0
+# Compressed module logs of failed suites go here
+FAILURE_DIR = "failure_logs"
+# Module log records shown under a failed assertion
+DEBUG_RECORDS = 10
+# Record every module logs first for a cmd store, output of it follows
+COMMAND_RE = re.compile(r": Param cmd set to: ")
+# State items shown in a test report
+STATE_ITEMS_SHOWN = 32
+# Module kept loaded for the whole run, one suite or reloaded for every test
+SCOPES = ["run", "suite", "test"]
+
+
+def format_items(items):
+    text = " ".join(str(item) for item in items[:STATE_ITEMS_SHOWN]) or "empty"
+    if len(items) > STATE_ITEMS_SHOWN:
+        text += f" ... ({len(items)} items)"
+    return text
+
+
+class ModuleFixture:
+    """Load state of one module, shared by the suites using it in a run"""
+
+    def __init__(self, users=1):
+        self.loaded = False
+        # A command ran since the module was loaded or reset
+        self.dirty = False
+        # Suites of the run still to release the module
+        self.users = users
+
+
+def share_fixtures(testers):
+    """Give run scoped testers of the same module one fixture"""
+    fixtures = {}
+    for tester in testers:
+        if tester.scope == "run":
+            fixture = fixtures.setdefault(tester.module_name, ModuleFixture(0))
+            fixture.users += 1
+            tester.fixture = fixture
 
 
 class BaseModuleTester:
-    def __init__(self, module_name):
+    # Command and its record bringing the module back to its state after
+    # loading, None when only reloading does
+    RESET = None
+
+    def __init__(self, module_name, backend=None):
         self.module_name = module_name
         # self.module_path = f"{module_name}.ko"
         self.module_path = module_name
@@ -14,82 +62,293 @@ class BaseModuleTester:
         self.test_count = 0
         self.passed_count = 0
         self.failed_count = 0
+        self.backend = backend or KernelBackend()
+        # Failure log of the suite, fed by whichever reader is in use
+        self.ring = LogRing(f"{module_name}: ")
+        self.kmsg = self.backend.open_log()
+        self.timeout = ASSERT_TIMEOUT
+        # ModuleTracer timing command handlers in the kernel, if enabled
+        self.tracer = None
+        # Log assertions of a deferred() block, checked when it ends
+        self.deferred_checks = None
+        self.cmd_stores = 0
+        self.scope = "test"
+        self.fixture = ModuleFixture()
+
+    @property
+    def kmsg(self):
+        return self._kmsg
+
+    @kmsg.setter
+    def kmsg(self, reader):
+        # Parallel runs swap in a demux channel after construction
+        reader.ring = self.ring
+        self._kmsg = reader
+
+    def sources(self):
+        """Source the suite outcome depends on besides the module: every
+        checker module, the log matcher and parameter writes included"""
+        texts = []
+        checker_dir = os.path.dirname(__file__)
+        for name in sorted(os.listdir(checker_dir)):
+            if name.endswith(".py"):
+                with open(os.path.join(checker_dir, name), "rb") as f:
+                    texts.append(f.read())
+        return texts
 
     def run_command(self, cmd, check=True):
         """Execute shell commands and return result"""
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            check=check,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        return result.stdout.strip()
+        return run_command(cmd, check)
 
     def load_module(self):
         """Load kernel module"""
         print(f"[+] Loading module {self.module_name}...")
-        self.run_command(f"sudo modprobe {self.module_name}")
-        time.sleep(0.5)
+        self.backend.load(self.module_name)
+        self.fixture.loaded = True
+        self.fixture.dirty = False
+        if self.tracer is not None:
+            self.tracer.attach()
 
     def unload_module(self):
         """Unload kernel module"""
         print(f"[+] Unloading module {self.module_name}...")
-        self.run_command(f"sudo rmmod {self.module_name}")
-        time.sleep(0.5)
+        if self.tracer is not None:
+            self.tracer.detach()
+        self.backend.unload(self.module_name)
+        self.fixture.loaded = False
+
+    def reset_module(self):
+        """Bring the loaded module back to its state after loading, through
+        its reset command or by loading it again"""
+        if self.RESET is not None:
+            cmd, pattern = self.RESET
+            print(f"[+] Resetting module {self.module_name}...")
+            self.set_parameter("cmd", cmd)
+            if self.tracer is not None:
+                self.tracer.take()
+            if self.wait_dmesg(pattern):
+                self.fixture.dirty = False
+                return
+        self.unload_module()
+        self.load_module()
+
+    def setup_module(self):
+        """Start a test on the module as loaded, loading or resetting it"""
+        self.clear_dmesg()
+        if not self.fixture.loaded:
+            self.load_module()
+        elif self.fixture.dirty:
+            self.reset_module()
+
+    def teardown_module(self):
+        """End a test, the module stays loaded unless scoped to the test"""
+        if self.scope == "test":
+            self.unload_module()
 
     def set_parameter(self, param, value):
         """Set module parameter via sysfs"""
-        param_path = f"{self.sysfs_path}/{param}"
-        self.run_command(f"echo '{value}' | sudo tee {param_path}")
-        time.sleep(0.2)
+        self.backend.set_parameter(self.module_name, param, value)
+        if param == "cmd":
+            self.cmd_stores += 1
+            self.fixture.dirty = True
+        if self.tracer is not None:
+            self.tracer.expect(param, value)
 
     def get_dmesg_output(self):
-        """Get dmesg output"""
-        return self.run_command("dmesg")
+        """Get recent module log records with the records around them"""
+        self.kmsg.read_available()
+        return self.ring.text()
+
+    def dump_failure_log(self):
+        """Save module log of the suite as failure_logs/<module>-<time>.log.gz"""
+        self.kmsg.read_available()
+        os.makedirs(FAILURE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(FAILURE_DIR, f"{self.module_name}-{stamp}.log.gz")
+        self.ring.dump(path)
+        return path
+
+    def report_error(self, error):
+        """Report exception that aborted the suite, return its exit code"""
+        print(f"\n[!] Test error: {error}")
+        print(f"Debug info saved to {self.dump_failure_log()}")
+        return 1
 
     def clear_dmesg(self):
-        """Clear dmesg buffer"""
-        self.run_command("sudo dmesg -C")
+        """Start reading kernel log from now on, ring buffer is left intact"""
+        self.kmsg.clear()
 
-    def assert_dmesg_contains(self, pattern, expected_msg):
-        """Check if dmesg contains specified pattern"""
-        self.test_count += 1
-        dmesg = self.get_dmesg_output()
-        match = re.search(pattern, dmesg)
+    def wait_dmesg(self, pattern, level=None):
+        """Wait for a module record after the cursor matching pattern, at
+        level or more severe when given; return match or None"""
+        max_level = LEVELS[level or "debug"]
+        return self.kmsg.wait_for(pattern, self.timeout, self.module_name, max_level)
+
+    def match_dmesg(self, regexes, levels=None, stop=None):
+        """Match regexes as an ordered subsequence of module records"""
+        if levels is None:
+            max_level = LEVELS["debug"]
+        else:
+            max_level = [LEVELS[level or "debug"] for level in levels]
+        return self.kmsg.match_sequence(
+            regexes, self.timeout, self.module_name, max_level, stop
+        )
+
+    def assert_dmesg_contains(self, pattern, expected_msg, level=None):
+        """Check that a module record after the cursor matches, return the match.
+        In a deferred() block the check is queued and None is returned."""
+        if self.deferred_checks is not None:
+            taken = self.tracer.take() if self.tracer is not None else None
+            self.deferred_checks.append(
+                (pattern, expected_msg, level, taken, self.cmd_stores)
+            )
+            return None
+        match = self.wait_dmesg(pattern, level)
+        return self.report_assertion(pattern, expected_msg, match, level)
+
+    @contextmanager
+    def deferred(self):
+        """Issue the block's commands back to back, then check its log
+        assertions in one pass over the new records. Each assertion is
+        matched only in the output of the last command issued before it,
+        and is still reported as its own test."""
+        self.deferred_checks = []
+        issued = self.cmd_stores
+        try:
+            yield
+        finally:
+            checks, self.deferred_checks = self.deferred_checks, None
+        # Ordered subsequence: every cmd store record, then the patterns of it
+        regexes, levels, slots = [], [], []
+        for pattern, _, level, _, stores in checks:
+            regexes += [COMMAND_RE] * (stores - issued)
+            levels += [None] * (stores - issued)
+            issued = stores
+            slots.append(len(regexes))
+            regexes.append(re.compile(pattern))
+            levels.append(level)
+        matches = self.match_dmesg(regexes, levels, stop=COMMAND_RE)
+        for (pattern, expected_msg, level, taken, _), slot in zip(checks, slots):
+            self.report_assertion(pattern, expected_msg, matches[slot], level, taken)
 
+    def report_assertion(self, pattern, expected_msg, match, level=None, taken=None):
+        """Count and print result of one log assertion, return the match"""
+        self.test_count += 1
         print(f"\nTest #{self.test_count}")
         print(f"Command:    {expected_msg}")
-        print(f"Expected:   Pattern '{pattern}'")
+        at_level = f" at level {level} or above" if level else ""
+        print(f"Expected:   Pattern '{pattern}'{at_level}")
         print(f"Found:      {'Yes' if match else 'No'}")
+        self.report_kernel_time(taken)
 
         if match:
             self.passed_count += 1
             print("Result:     PASS")
-            return True
+            return match
         else:
             self.failed_count += 1
             print("Result:     FAIL")
             print("Debug info:")
-            print(dmesg[-500:])  # Show last 500 characters of log
+            self.kmsg.read_available()
+            print(self.ring.tail(DEBUG_RECORDS))
             return False
 
+    def report_kernel_time(self, taken=None):
+        """Print in-kernel time of the commands issued since the last test"""
+        if self.tracer is None:
+            return
+        if taken is None:
+            taken = self.tracer.take()
+        if taken:
+            print(f"Kernel:     {self.tracer.format_step(taken)}")
+
+    def assert_condition(self, condition, expected_msg, description, found=None):
+        """Count and print result of a check on data parsed from the log"""
+        self.test_count += 1
+        print(f"\nTest #{self.test_count}")
+        print(f"Command:    {expected_msg}")
+        print(f"Expected:   {description}")
+        if found is not None:
+            print(f"Found:      {found}")
+        self.report_kernel_time()
+        if condition:
+            self.passed_count += 1
+            print("Result:     PASS")
+        else:
+            self.failed_count += 1
+            print("Result:     FAIL")
+        return condition
+
+    def read_state(self):
+        """Items of the module structure from its read-only state parameter,
+        pages after the first are selected through state_start"""
+        items, start = [], 0
+        while True:
+            fields = self.backend.get_parameter(self.module_name, "state").split()
+            items += [int(item) for item in fields[1:]]
+            if len(items) >= int(fields[0]) or len(items) == start:
+                break
+            start = len(items)
+            self.backend.set_parameter(self.module_name, "state_start", start)
+        if start:
+            # Next read starts from the first item again
+            self.backend.set_parameter(self.module_name, "state_start", 0)
+        return items
+
+    def assert_state(self, expected, expected_msg, description=None):
+        """Check items read from the state parameter, return them"""
+        items = self.read_state()
+        self.assert_condition(
+            items == expected,
+            expected_msg,
+            description or f"State: {format_items(expected)}",
+            found=None if items == expected else f"State: {format_items(items)}",
+        )
+        return items
+
     def test_module_lifecycle(self):
-        """Test module loading/unloading"""
+        """Test module loading, and unloading when scoped to the test"""
         print("\n=== Module Lifecycle Tests ===")
         self.clear_dmesg()
+        if self.fixture.loaded:
+            print(f"[=] {self.module_name} already loaded in this run")
+            return
 
         self.load_module()
         self.assert_dmesg_contains(
             rf"{self.module_name} module loaded", "Module loading"
         )
+        if self.scope == "test":
+            self.unload_module()
+            self.assert_dmesg_contains(
+                rf"{self.module_name} module unloaded", "Module unloading"
+            )
 
+    def release_module(self):
+        """End of the suite: unload the module unless a later suite uses it"""
+        self.fixture.users -= 1
+        if self.fixture.users > 0 or not self.fixture.loaded:
+            return
+        print("\n=== Module Unload Test ===")
+        self.clear_dmesg()
         self.unload_module()
         self.assert_dmesg_contains(
             rf"{self.module_name} module unloaded", "Module unloading"
         )
 
+    def run_suite(self, *tests):
+        """Run lifecycle and test methods, return exit code of the suite"""
+        try:
+            try:
+                self.test_module_lifecycle()
+                for test in tests:
+                    test()
+            finally:
+                self.release_module()
+            return self.print_summary()
+        except Exception as e:
+            return self.report_error(e)
+
     def print_summary(self):
         """Print test summary report"""
         print("\n=== Test Summary ===")
@@ -97,14 +356,25 @@ class BaseModuleTester:
         print(f"Passed:       {self.passed_count}")
         print(f"Failed:       {self.failed_count}")
         print(f"Success rate: {self.passed_count/self.test_count*100:.1f}%")
+        if self.tracer is not None:
+            self.print_kernel_summary()
 
         if self.failed_count == 0:
             print("\nFINAL RESULT: ALL TESTS PASSED")
             return 0
         else:
+            print(f"Module log:   {self.dump_failure_log()}")
             print("\nFINAL RESULT: SOME TESTS FAILED")
             return 1
 
+    def print_kernel_summary(self):
+        """Per function in-kernel time over all traced commands"""
+        self.tracer.close()
+        print(f"\n=== In-Kernel Time ({self.tracer.source()}) ===")
+        print(f"{'function':<24} {'calls':>7} {'mean us':>10} {'max us':>10}")
+        for name, count, total, peak in self.tracer.function_totals():
+            print(f"{name:<24} {count:>7} {total / count:>10.3f} {peak:>10.3f}")
+
     def run_all_tests(self):
         """Main test runner (to be implemented by subclasses)"""
         raise NotImplementedError("Subclasses must implement run_all_tests()")
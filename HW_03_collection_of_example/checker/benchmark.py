@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+import json
+import math
+import os
+import random
+import time
+from collections import namedtuple
+
+from .kmsg import split_commands
+
+# Values stored in structures start here (bin_tree already holds 20..80)
+KEY_BASE = 1000
+
+
+def new_key(i, size, rng):
+    return KEY_BASE + size + i
+
+
+def existing_key(i, size, rng):
+    return KEY_BASE + rng.randrange(size) if size else KEY_BASE + i
+
+
+def bit_index(i, size, rng):
+    return rng.randrange(64)
+
+
+def nested_brackets(i, size, rng):
+    depth = max(size // 2, 1)
+    return "(" * depth + ")" * depth
+
+
+# One benchmarked command: value generator and untimed command restoring size
+BenchOp = namedtuple("BenchOp", "cmd value restore")
+
+# param: parameter taking the value ("{}" in cmd when the value is inline)
+# fill: command growing the structure to the requested size before timing
+# max_size: largest size the module accepts (0: size does not apply)
+BENCH_SPECS = {
+    "list": {
+        "param": "value",
+        "fill": "add",
+        "ops": [
+            BenchOp("add", new_key, "del"),
+            BenchOp("find", existing_key, None),
+            BenchOp("del", existing_key, "add"),
+        ],
+    },
+    "queue": {
+        "param": "value",
+        "fill": "enqueue",
+        # kfifo capacity, one slot is left for the timed enqueue
+        "max_size": 127,
+        "ops": [
+            BenchOp("enqueue", new_key, "dequeue"),
+            BenchOp("peek", None, None),
+            BenchOp("total", None, None),
+            BenchOp("dequeue", None, "enqueue"),
+        ],
+    },
+    "rb_tree": {
+        "param": "value",
+        "fill": "insert",
+        "ops": [
+            BenchOp("insert", new_key, "delete"),
+            BenchOp("find", existing_key, None),
+            BenchOp("delete", existing_key, "insert"),
+        ],
+    },
+    "bin_tree": {
+        "param": "value",
+        "fill": "insert",
+        "ops": [
+            BenchOp("insert", new_key, "delete"),
+            BenchOp("delete", existing_key, "insert"),
+        ],
+    },
+    "bitmap": {
+        "param": "index",
+        "max_size": 0,
+        "ops": [
+            BenchOp("set", bit_index, None),
+            BenchOp("test", bit_index, None),
+            BenchOp("flip", bit_index, None),
+            BenchOp("count", None, None),
+            BenchOp("find_set", None, None),
+        ],
+    },
+    "bin_search": {
+        "param": "value",
+        "setup": ["sort"],
+        "max_size": 0,
+        "ops": [BenchOp("search", lambda i, size, rng: rng.randrange(200), None)],
+    },
+    "stack": {
+        "param": "value",
+        "fill": "push",
+        "ops": [
+            BenchOp("push", new_key, "pop"),
+            BenchOp("pop", None, "push"),
+        ],
+    },
+    "stack2": {
+        "param": None,
+        "fill": "push {}",
+        "ops": [
+            BenchOp("push {}", new_key, "pop"),
+            BenchOp("top", None, None),
+            BenchOp("size", None, None),
+            BenchOp("pop", None, "push {}"),
+        ],
+    },
+    "brackets": {
+        "param": "input",
+        # Longest charp parameter value
+        "max_size": 1024,
+        "ops": [BenchOp("validate", nested_brackets, None)],
+    },
+}
+
+
+def percentiles(values):
+    """p50/p95/p99 (nearest rank) and mean of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+    return {
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "mean": sum(ordered) / len(ordered),
+    }
+
+
+class ModuleBenchmark:
+    """Drive one module through its command parameters and time each command"""
+
+    def __init__(self, backend, module_type, module_name, rng):
+        self.backend = backend
+        self.spec = BENCH_SPECS[module_type]
+        self.module_type = module_type
+        self.module_name = module_name
+        self.rng = rng
+        self.kmsg = backend.open_log()
+        self.groups = []
+
+    def issue(self, cmd, value):
+        """Write value and command, return userspace time of the command write"""
+        param = self.spec["param"]
+        if "{}" in cmd:
+            cmd = cmd.format(value)
+        elif param is not None and value is not None:
+            self.backend.set_parameter(self.module_name, param, value)
+        start = time.perf_counter_ns()
+        self.backend.set_parameter(self.module_name, "cmd", cmd)
+        return (time.perf_counter_ns() - start) / 1000
+
+    def collect(self):
+        """Split new module records into per-command groups"""
+        records = self.kmsg.read_available()
+        self.groups.extend(split_commands(records, self.module_name))
+        self.kmsg.discard()
+
+    def run_op(self, op, size, ops):
+        self.kmsg.clear()
+        self.groups = []
+        user_us = []
+        # Commands restored by a fill remove an item, on an empty structure
+        # they only miss and growing it back would leave it larger than size
+        restore = op.restore
+        if size == 0 and restore == self.spec.get("fill"):
+            restore = None
+        for i in range(ops):
+            value = op.value(i, size, self.rng) if op.value else None
+            user_us.append(self.issue(op.cmd, value))
+            if restore:
+                # pop and dequeue take no value, any new key refills the slot
+                if value is None:
+                    value = new_key(i, size, self.rng)
+                self.issue(restore, value)
+            if i % 256 == 255:
+                # Keep up with the ring buffer so no record is overwritten
+                self.collect()
+        self.collect()
+
+        # Command writes alternate with restore writes when there are any
+        step = 2 if restore else 1
+        timed = self.groups[::step]
+        kmsg_us = [group[-1].ts_usec - group[0].ts_usec for group in timed]
+        return {
+            "module": self.module_name,
+            "type": self.module_type,
+            "cmd": op.cmd.replace(" {}", ""),
+            "size": size,
+            "ops": ops,
+            "ops_per_sec": ops / (sum(user_us) / 1e6) if sum(user_us) else None,
+            "user_us": percentiles(user_us),
+            "kmsg_us": percentiles(kmsg_us) if len(timed) == ops else None,
+        }
+
+    def run(self, sizes, ops):
+        results = []
+        max_size = self.spec.get("max_size")
+        for size in sorted(
+            {min(s, max_size) for s in sizes} if max_size is not None else set(sizes)
+        ):
+            self.backend.load(self.module_name)
+            try:
+                for cmd in self.spec.get("setup", []):
+                    self.issue(cmd, None)
+                if "fill" in self.spec:
+                    for key in self.rng.sample(range(size), size):
+                        self.issue(self.spec["fill"], KEY_BASE + key)
+                for op in self.spec["ops"]:
+                    results.append(self.run_op(op, size, ops))
+            finally:
+                self.backend.unload(self.module_name)
+        return results
+
+
+def print_results(results):
+    print(
+        f"\n{'module':<14} {'cmd':<10} {'size':>6} {'ops/s':>10} "
+        f"{'p50us':>8} {'p95us':>8} {'p99us':>8} {'kmsg p50us':>10}"
+    )
+    for r in results:
+        kmsg = f"{r['kmsg_us']['p50']:.1f}" if r["kmsg_us"] else "-"
+        print(
+            f"{r['module']:<14} {r['cmd']:<10} {r['size']:>6} "
+            f"{r['ops_per_sec'] or 0:>10.0f} {r['user_us']['p50']:>8.1f} "
+            f"{r['user_us']['p95']:>8.1f} {r['user_us']['p99']:>8.1f} {kmsg:>10}"
+        )
+
+
+def run_benchmarks(backend, modules, sizes, ops, output, seed=None):
+    """Benchmark (module_type, module_name) pairs, append run to JSON lines file"""
+    rng = random.Random(seed)
+    results = []
+    for module_type, module_name in modules:
+        print(f"[+] Benchmarking {module_name}...")
+        bench = ModuleBenchmark(backend, module_type, module_name, rng)
+        results.extend(bench.run(sizes, ops))
+    print_results(results)
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "kernel": os.uname().release,
+        "backend": backend.name,
+        "ops": ops,
+        "sizes": sizes,
+        "seed": seed,
+        "results": results,
+    }
+    with open(output, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"\nResults appended to {output}")
+    return 0
@@ -1,46 +1,144 @@
 #!/usr/bin/env python3
-from .base_tester import BaseModuleTester
+import array
+import bisect
 import random
 import re
 
+from .base_tester import BaseModuleTester
+from .registry import register
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Values not in the array searched in addition to every present one
+ABSENT_SEARCHES = 100
+# Searches issued before their replies are checked
+SEARCH_BATCH = 256
+
+
+def parse_values(text):
+    """Array printed by print_arr() as numpy array or array.array"""
+    if np is not None:
+        return np.array(text.split(), dtype=np.int64)
+    return array.array("q", map(int, text.split()))
+
+
+def is_sorted(values):
+    if np is not None:
+        return bool(np.all(values[:-1] <= values[1:]))
+    return all(a <= b for a, b in zip(values, values[1:]))
+
+
+def in_range(values, nr_val):
+    if np is not None:
+        return bool(np.all((values >= 0) & (values < nr_val)))
+    return all(0 <= v < nr_val for v in values)
+
+
+def same_multiset(a, b):
+    if np is not None:
+        return np.array_equal(np.sort(a), np.sort(b))
+    return sorted(a) == sorted(b)
+
+
+def present_values(values):
+    """Distinct values of the array in ascending order"""
+    if np is not None:
+        return np.unique(values).tolist()
+    return sorted(set(values))
+
+
+def absent_values(values, nr_val, count):
+    """Up to count values of 0..nr_val-1 missing from the array, and edge values"""
+    if np is not None:
+        missing = np.setdiff1d(np.arange(nr_val), values).tolist()
+    else:
+        missing = sorted(set(range(nr_val)) - set(values))
+    # value is an int parameter, -1 is searched as u32 4294967295
+    return random.sample(missing, min(count, len(missing))) + [nr_val, -1]
+
+
+def expected_found(sorted_values, queries):
+    """Reference binary search result for every query"""
+    if np is not None:
+        queries = np.array(queries, dtype=np.int64) % 2**32
+        index = np.searchsorted(sorted_values, queries)
+        clipped = np.minimum(index, len(sorted_values) - 1)
+        return (
+            (index < len(sorted_values)) & (sorted_values[clipped] == queries)
+        ).tolist()
+    found = []
+    for query in queries:
+        query %= 2**32
+        i = bisect.bisect_left(sorted_values, query)
+        found.append(i < len(sorted_values) and sorted_values[i] == query)
+    return found
+
 
+@register("bin_search")
 class BSearchModuleTester(BaseModuleTester):
+    def print_array(self, expected_msg):
+        """Print array, return its values joined from all records of the line"""
+        self.set_parameter("cmd", "print")
+        match = self.assert_dmesg_contains(
+            r"Current array \((\d+) elements\):(.*)", expected_msg
+        )
+        if not match:
+            return None
+        return parse_values(match.group(2) + self.kmsg.continuation())
+
+    def search_all(self, sorted_values, queries):
+        """Search every query in batches, return queries answered wrongly"""
+        expected = expected_found(sorted_values, queries)
+        wrong = []
+        for start in range(0, len(queries), SEARCH_BATCH):
+            batch = queries[start : start + SEARCH_BATCH]
+            for query in batch:
+                self.set_parameter("value", query)
+                self.set_parameter("cmd", "search")
+            regexes = [
+                re.compile(rf": Value {query % 2**32} (not )?found in array$")
+                for query in batch
+            ]
+            matches = self.match_dmesg(regexes)
+            for query, found, match in zip(batch, expected[start:], matches):
+                if match is None or (match.group(1) is None) != found:
+                    wrong.append(query)
+        return wrong
+
     def test_bsearch_operations(self):
         """Binary search specific test operations"""
         print("\n=== Binary Search Operation Tests ===")
-        saved_values = []  # For saved values for search test
-        self.clear_dmesg()
-        self.load_module()
+        self.setup_module()
 
         try:
             # Initialize array
             print("\n--- Initialize Array ---")
             self.set_parameter("cmd", "init")
-            self.assert_dmesg_contains(
-                r"Initialized array with 100 random elements",
+            match = self.assert_dmesg_contains(
+                r"Initialized array with (\d+) random elements",
                 "Initialize array with random values",
             )
+            if not match:
+                return
+            nr_val = int(match.group(1))
 
             # Test print unsorted array
             print("\n--- Print Unsorted Array ---")
-            self.set_parameter("cmd", "print")
-            dmesg_output = self.get_dmesg_output()
-
-            # Saving values for search
-            values_line = re.search(
-                r"Current array \(\d+ elements\):(.*)", dmesg_output
-            )
-            if values_line:
-                saved_values = [
-                    int(v) for v in values_line.group(1).split() if v.strip()
-                ]
-                print(f"Saved array values: {saved_values[:10]}...")  # first 10 values
-            self.assert_dmesg_contains(
-                r"Current array \(100 elements\):", "Print unsorted array"
-            )
+            unsorted = self.print_array("Print unsorted array")
             self.assert_dmesg_contains(
                 r"Array is NOT sorted", "Verify array is not sorted"
             )
+            if unsorted is None:
+                return
+            print(f"Saved array values: {unsorted[:10].tolist()}...")  # first 10 values
+            self.assert_condition(
+                len(unsorted) == nr_val and in_range(unsorted, nr_val),
+                "Check printed array",
+                f"{nr_val} values in range 0..{nr_val - 1}",
+            )
 
             # Test sort operation
             print("\n--- Sort Operation ---")
@@ -48,30 +146,30 @@ class BSearchModuleTester(BaseModuleTester):
             self.assert_dmesg_contains(r"Array sorted", "Sort array")
 
             # Verify array after sort
-            self.set_parameter("cmd", "print")
+            values = self.print_array("Print sorted array")
             self.assert_dmesg_contains(r"Array is sorted", "Verify array is sorted")
-
-            # Test search with random existing value
-            print("\n--- Search Existing Value ---")
-            if not saved_values:
-                print("Warning: No values saved from array printout")
+            if values is None:
                 return
-
-            # Get random value from saved
-            test_value = random.choice(saved_values)
-            self.set_parameter("value", test_value)
-            self.set_parameter("cmd", "search")
-            self.assert_dmesg_contains(
-                f"Value {test_value} found in array",
-                f"Search existing value {test_value}",
+            self.assert_condition(
+                is_sorted(values), "Check sorted array order", "Ascending values"
+            )
+            self.assert_condition(
+                same_multiset(unsorted, values),
+                "Check sorted array contents",
+                "Same multiset of values as before sort",
             )
 
-            # Test search with non-existing value
-            print("\n--- Search Non-existing Value ---")
-            self.set_parameter("value", 100)  # 100 is outside 0-99 range
-            self.set_parameter("cmd", "search")
-            self.assert_dmesg_contains(
-                r"Value 100 not found in array", "Search non-existing value 100"
+            # Search every value and a batch of absent ones
+            print("\n--- Search All Values ---")
+            present = present_values(values)
+            absent = absent_values(values, nr_val, ABSENT_SEARCHES)
+            wrong = self.search_all(values, present + absent)
+            if wrong:
+                print(f"Wrong search results for: {wrong[:10]}")
+            self.assert_condition(
+                not wrong,
+                f"Search {len(present)} present and {len(absent)} absent values",
+                "Every result agrees with reference binary search",
             )
 
             # Verify array remains unchanged after searches
@@ -81,17 +179,8 @@ class BSearchModuleTester(BaseModuleTester):
             )
 
         finally:
-            self.unload_module()
+            self.teardown_module()
 
     def run_all_tests(self):
         """Execute all binary search module tests"""
-        try:
-            self.test_module_lifecycle()
-            self.test_bsearch_operations()
-            return self.print_summary()
-        except Exception as e:
-            print(f"\n[!] Test error: {e}")
-            with open("dmesg_failure.log", "w") as f:
-                f.write(self.get_dmesg_output())
-            print("Debug info saved to dmesg_failure.log")
-            return 1
+        return self.run_suite(self.test_bsearch_operations)
@@ -1,13 +1,148 @@
 #!/usr/bin/env python3
-from .base_tester import BaseModuleTester
+import random
+import re
+
+from .base_tester import COMMAND_RE, BaseModuleTester
+from .registry import register
+
+# Random set/clear/flip/test operations and how often the model is compared
+RANDOM_OPS = 2000
+CHECK_EVERY = 250
+
+# Word printed by the module after each modifying command
+DONE = {"set": "set", "clear": "cleared", "flip": "flipped"}
+
+
+def parse_image(text):
+    """Printed bitmap as int, character i is bit i"""
+    return int(text[::-1], 2) if text else 0
+
+
+class BitmapModel:
+    """Reference bitmap kept in one Python int"""
+
+    def __init__(self, max_bits):
+        self.max_bits = max_bits
+        self.bits = 0
+
+    def apply(self, cmd, index):
+        """Update model, return line the module prints for the command"""
+        if index >= self.max_bits:
+            return f"Index {index} out of bounds (max {self.max_bits - 1})"
+        mask = 1 << index
+        if cmd == "set":
+            self.bits |= mask
+        elif cmd == "clear":
+            self.bits &= ~mask
+        elif cmd == "flip":
+            self.bits ^= mask
+        else:
+            return f"Bit {index} is {'set' if self.bits & mask else 'not set'}"
+        return f"Bit {index} {DONE[cmd]}"
+
+    def queries(self):
+        """find_set, find_zero and count replies expected from the module"""
+        bits = self.bits
+        zeros = ~bits & ((1 << self.max_bits) - 1)
+        return {
+            "find_set": (
+                f"First set bit found at position {(bits & -bits).bit_length() - 1}"
+                if bits
+                else "No set bits found"
+            ),
+            "find_zero": (
+                f"First zero bit found at position {(zeros & -zeros).bit_length() - 1}"
+                if zeros
+                else "All bits are set"
+            ),
+            "count": f"Number of set bits: {bits.bit_count()}",
+        }
+
+
+@register("bitmap")
+class BitmapModuleTester(BaseModuleTester):
+    RESET = ("clear_all", r"All bits cleared")
+
+    def print_image(self, expected_msg):
+        """Print bitmap, return image joined from all records of the line"""
+        self.set_parameter("cmd", "print")
+        match = self.assert_dmesg_contains(r"Current bitmap: ([01]*)$", expected_msg)
+        if not match:
+            return None
+        return match.group(1) + self.kmsg.continuation()
+
+    def run_commands(self, commands):
+        """Issue (cmd, index, expected line) triples, return mismatched ones"""
+        for cmd, index, _ in commands:
+            if index is not None:
+                self.set_parameter("index", index)
+            self.set_parameter("cmd", cmd)
+        # Each line is matched only in the output of its own cmd store
+        regexes = []
+        for _, _, line in commands:
+            regexes += [COMMAND_RE, re.compile(f": {re.escape(line)}$")]
+        matches = self.match_dmesg(regexes, stop=COMMAND_RE)[1::2]
+        return [command for command, match in zip(commands, matches) if match is None]
+
+    def test_random_operations(self):
+        """Random operations verified against the int model"""
+        print("\n=== Bitmap Random Operation Tests ===")
+        self.setup_module()
 
+        try:
+            image = self.print_image("Print initial bitmap")
+            if image is None:
+                return
+            model = BitmapModel(len(image))
+            seed = random.randrange(2**32)
+            rng = random.Random(seed)
+            print(f"Bitmap size {model.max_bits} bits, seed {seed}")
+
+            wrong_ops, wrong_queries, wrong_images, checks = [], [], 0, 0
+            # Indices past the end check the bounds error as well
+            limit = model.max_bits + max(model.max_bits // 16, 1)
+            for start in range(0, RANDOM_OPS, CHECK_EVERY):
+                commands = []
+                for _ in range(min(CHECK_EVERY, RANDOM_OPS - start)):
+                    cmd = rng.choice(("set", "clear", "flip", "test"))
+                    index = rng.randrange(limit)
+                    commands.append((cmd, index, model.apply(cmd, index)))
+                wrong_ops += self.run_commands(commands)
+
+                queries = [(cmd, None, line) for cmd, line in model.queries().items()]
+                wrong_queries += self.run_commands(queries)
+                image = self.print_image(
+                    f"Print bitmap after {start + len(commands)} ops"
+                )
+                if image is None or parse_image(image) != model.bits:
+                    wrong_images += 1
+                checks += 1
+
+            for cmd, index, line in (wrong_ops + wrong_queries)[:10]:
+                print(f"Expected '{line}' for {cmd} {'' if index is None else index}")
+            self.assert_condition(
+                not wrong_ops,
+                f"Apply {RANDOM_OPS} random set/clear/flip/test operations",
+                "Every reply matches the model",
+            )
+            self.assert_condition(
+                not wrong_queries,
+                f"Check find_set, find_zero and count at {checks} checkpoints",
+                "Same as bit scans and int.bit_count() of the model",
+            )
+            self.assert_condition(
+                wrong_images == 0,
+                f"Compare {checks} printed bitmaps",
+                "Whole image equals the model",
+            )
+
+        finally:
+            self.teardown_module()
 
-class BitmapModuleTester(BaseModuleTester):
     def test_bitmap_operations(self):
         """Bitmap-specific test operations"""
         print("\n=== Bitmap Operation Tests ===")
-        self.clear_dmesg()
-        self.load_module()
+        self.setup_module()
 
         try:
             # Test setting bits
@@ -22,9 +157,11 @@ class BitmapModuleTester(BaseModuleTester):
 
             # Test print operation
             print("\n--- Print Operation ---")
-            self.set_parameter("cmd", "print")
-            self.assert_dmesg_contains(
-                r"Current bitmap: 1[01]{4}1[0]+", "Verify bitmap contents [0,5 set]"
+            image = self.print_image("Print bitmap")
+            self.assert_condition(
+                image is not None and parse_image(image) == 1 << 0 | 1 << 5,
+                "Verify bitmap contents [0,5 set]",
+                "Only bits 0 and 5 set in the whole image",
             )
 
             # Test test operation
@@ -74,18 +211,22 @@ class BitmapModuleTester(BaseModuleTester):
             self.set_parameter("cmd", "clear_all")
             self.assert_dmesg_contains(r"All bits cleared", "Clear all bits")
 
+            # Test index past the end
+            print("\n--- Bounds Check ---")
+            if image is not None:
+                index = len(image)
+                for cmd in ("set", "clear", "test", "flip"):
+                    self.set_parameter("index", index)
+                    self.set_parameter("cmd", cmd)
+                    self.assert_dmesg_contains(
+                        rf"Index {index} out of bounds \(max {index - 1}\)",
+                        f"{cmd.capitalize()} bit {index} past the end",
+                        level="err",
+                    )
+
         finally:
-            self.unload_module()
+            self.teardown_module()
 
     def run_all_tests(self):
         """Execute all bitmap module tests"""
-        try:
-            self.test_module_lifecycle()
-            self.test_bitmap_operations()
-            return self.print_summary()
-        except Exception as e:
-            print(f"\n[!] Test error: {e}")
-            with open("dmesg_failure.log", "w") as f:
-                f.write(self.get_dmesg_output())
-            print("Debug info saved to dmesg_failure.log")
-            return 1
+        return self.run_suite(self.test_bitmap_operations, self.test_random_operations)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "kern-checker"
+)
+# Least recently used entries are evicted once the cache grows past this
+MAX_CACHE_BYTES = 1 << 20
+
+
+class ResultCache:
+    """Passing suite results keyed by hash of module, checker source and kernel"""
+
+    def __init__(self, backend, path=None, max_bytes=MAX_CACHE_BYTES, force=False):
+        self.backend = backend
+        self.path = path or CACHE_DIR
+        self.max_bytes = max_bytes
+        # Forced runs do not look results up, but still record them
+        self.force = force
+        # Key of each tester, taken before its run so the run records under it
+        self.keys = {}
+
+    def key(self, tester):
+        """Content address of one suite run"""
+        h = hashlib.sha256()
+        for part in (
+            self.backend.name,
+            os.uname().release,
+            tester.module_name,
+            # Scopes run different lifecycle checks and resets
+            tester.scope,
+            self.backend.module_digest(tester.module_name),
+        ):
+            h.update(part.encode() + b"\0")
+        for source in tester.sources():
+            h.update(hashlib.sha256(source).digest())
+        return h.hexdigest()
+
+    def _entry_path(self, tester):
+        if tester not in self.keys:
+            self.keys[tester] = self.key(tester)
+        return os.path.join(self.path, f"{self.keys[tester]}.json")
+
+    def lookup(self, tester):
+        """Recorded passing result of the suite, None when it has to run"""
+        path = self._entry_path(tester)
+        if self.force:
+            return None
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            # Hits count as use for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def record(self, tester, exit_code, elapsed):
+        """Keep result of a passing suite, drop the entry of a failing one"""
+        path = self._entry_path(tester)
+        del self.keys[tester]
+        if exit_code != 0:
+            if os.path.exists(path):
+                os.unlink(path)
+            return
+        entry = {
+            "module": tester.module_name,
+            "passed": tester.passed_count,
+            "tests": tester.test_count,
+            "elapsed": elapsed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        os.makedirs(self.path, exist_ok=True)
+        # Concurrent checker runs never read a partial entry
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        with os.scandir(self.path) as it:
+            for item in it:
+                if item.name.endswith(".json"):
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+import json
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from .differential import MODELS, format_op
+from .kmsg import PARAM_RE
+
+# Default "cmd:weight" mixes and the command reading the final state back
+CONTENTION_SPECS = {
+    "list": {"mix": "add:2,del:1,find:1", "readout": "print"},
+    "queue": {"mix": "enqueue:1,dequeue:1", "readout": "print"},
+    "stack": {"mix": "push:1,pop:1", "readout": "print"},
+    "stack2": {"mix": "push:1,pop:1", "readout": "clear"},
+    "rb_tree": {"mix": "insert:2,delete:1,find:1", "readout": "print"},
+}
+# Values collide often so that deletes and finds hit
+VALUE_DOMAIN = 100
+# How often the log is drained while writers run
+DRAIN_INTERVAL = 0.01
+
+
+def parse_mix(text, model_cls):
+    """'cmd:weight,...' as (model cmd, weight, takes value) triples"""
+    ops = {cmd.replace(" {}", ""): (cmd, takes) for cmd, _, takes in model_cls.ops}
+    mix = []
+    for item in text.split(","):
+        name, _, weight = item.strip().partition(":")
+        if name not in ops:
+            raise ValueError(f"unknown command '{name}', one of: {', '.join(ops)}")
+        cmd, takes_value = ops[name]
+        mix.append((cmd, float(weight or 1), takes_value))
+    return mix
+
+
+def make_schedule(rng, mix, workers, ops):
+    """Operations of every worker, ops in total"""
+    cmds = [(cmd, takes_value) for cmd, _, takes_value in mix]
+    weights = [weight for _, weight, _ in mix]
+    return [
+        [
+            (cmd, rng.randrange(VALUE_DOMAIN) if takes_value else None)
+            for cmd, takes_value in rng.choices(cmds, weights, k=ops // workers)
+        ]
+        for _ in range(workers)
+    ]
+
+
+def issue(backend, module_name, param, cmd, value):
+    if "{}" in cmd:
+        backend.set_parameter(module_name, "cmd", cmd.format(value))
+        return
+    if value is not None:
+        backend.set_parameter(module_name, param, value)
+    backend.set_parameter(module_name, "cmd", cmd)
+
+
+def write_ops(backend, module_name, param, ops, barrier=None):
+    """Writer: issue ops back to back, return (start, end, failed writes)"""
+    if barrier is not None:
+        barrier.wait()
+    failed = 0
+    start = time.monotonic()
+    for cmd, value in ops:
+        try:
+            issue(backend, module_name, param, cmd, value)
+        except OSError:
+            failed += 1
+    return start, time.monotonic(), failed
+
+
+def _process_writer(spec, module_name, param, ops, barrier, results):
+    """Process pool worker, talks to the module through its own backend"""
+    name, path = spec
+    if name == "helper":
+        from .helper import HelperBackend
+
+        backend = HelperBackend(path)
+    else:
+        from .backend import KernelBackend
+
+        backend = KernelBackend()
+    results.put(write_ops(backend, module_name, param, ops, barrier))
+
+
+def process_spec(backend):
+    """How a worker process reaches the module, None when it cannot"""
+    if backend.name == "kernel":
+        return ("kernel", None)
+    if backend.name == "helper":
+        return ("helper", backend.path)
+    # Simulated modules live in this process only
+    return None
+
+
+def linearize(records, module_name):
+    """(cmd, value in effect, output lines) of every cmd store in log order.
+    Stores to one module are serialized by kernel_param_lock(), the log
+    order is the order the module applied them in."""
+    prefix = f"{module_name}: "
+    ops, current, owned = [], None, False
+    # value parameter is 0 after load
+    value = 0
+    for record in records:
+        if record.cont:
+            if owned and current is not None and current[2]:
+                current[2][-1] += record.text
+            continue
+        owned = record.text.startswith(prefix)
+        if not owned:
+            continue
+        text = record.text[len(prefix) :]
+        match = PARAM_RE.match(text)
+        if match and match.group(1) == "cmd":
+            current = [text.split("set to: ", 1)[1], value, []]
+            ops.append(current)
+        elif match:
+            value = int(text.rsplit(" ", 1)[1])
+            current = None
+        elif current is not None and not text.startswith("Executing command:"):
+            current[2].append(text)
+    return ops
+
+
+def resolve(model, cmd_text, value):
+    """Model operation of a logged cmd store"""
+    name, _, arg = cmd_text.partition(" ")
+    for cmd, _, takes_value in model.ops:
+        if arg and cmd == f"{name} {{}}":
+            return cmd, int(arg)
+        if cmd == cmd_text:
+            return cmd, value if takes_value else None
+    return cmd_text, None
+
+
+def check_log(model_cls, logged):
+    """Replay logged stores on the model: interleaving, diverged stores and
+    whether the last one (the readout) matched"""
+    model = model_cls()
+    interleaving, diverged = [], []
+    matched = True
+    for i, (cmd_text, value, lines) in enumerate(logged):
+        op = resolve(model, cmd_text, value)
+        interleaving.append(op)
+        expected = model.apply(*op)
+        actual = [model.normalize(line) for line in lines]
+        matched = actual == expected
+        if not matched:
+            diverged.append((i, op, expected, actual))
+    return interleaving, diverged, matched
+
+
+class ContentionRun:
+    """One module load driven by several writers, checked from its log"""
+
+    def __init__(self, backend, module_type, module_name):
+        self.backend = backend
+        self.module_type = module_type
+        self.module_name = module_name
+        self.model_cls = MODELS[module_type]
+        self.param = self.model_cls.param or "value"
+        self.readout = CONTENTION_SPECS[module_type]["readout"]
+
+    def drive(self, start_writers, kmsg):
+        """Start writers, drain log until they finish, return their results"""
+        pending = start_writers()
+        while not all(p.done() for p in pending):
+            kmsg.read_available()
+            time.sleep(DRAIN_INTERVAL)
+        return [p.result() for p in pending]
+
+    def run_threads(self, schedule, kmsg):
+        barrier = threading.Barrier(len(schedule))
+        with ThreadPoolExecutor(max_workers=len(schedule)) as pool:
+            return self.drive(
+                lambda: [
+                    pool.submit(
+                        write_ops,
+                        self.backend,
+                        self.module_name,
+                        self.param,
+                        ops,
+                        barrier,
+                    )
+                    for ops in schedule
+                ],
+                kmsg,
+            )
+
+    def run_processes(self, schedule, kmsg):
+        ctx = multiprocessing.get_context("spawn")
+        barrier = ctx.Barrier(len(schedule))
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(
+                target=_process_writer,
+                args=(
+                    process_spec(self.backend),
+                    self.module_name,
+                    self.param,
+                    ops,
+                    barrier,
+                    results,
+                ),
+            )
+            for ops in schedule
+        ]
+        for proc in procs:
+            proc.start()
+        done = []
+        while len(done) < len(procs):
+            kmsg.read_available()
+            while not results.empty():
+                done.append(results.get())
+            if len(done) < len(procs) and not any(p.is_alive() for p in procs):
+                raise RuntimeError("writer process died")
+            time.sleep(DRAIN_INTERVAL)
+        for proc in procs:
+            proc.join()
+        return done
+
+    def run(self, kind, schedule):
+        """Run schedule with kind ('threads', 'processes' or 'serial')"""
+        self.backend.load(self.module_name)
+        try:
+            kmsg = self.backend.open_log()
+            kmsg.clear()
+            if kind == "threads":
+                writers = self.run_threads(schedule, kmsg)
+            elif kind == "processes":
+                writers = self.run_processes(schedule, kmsg)
+            else:
+                writers = [
+                    write_ops(self.backend, self.module_name, self.param, ops)
+                    for ops in schedule
+                ]
+            issue(self.backend, self.module_name, self.param, self.readout, None)
+            kmsg.read_available()
+            logged = linearize(kmsg.index, self.module_name)
+            kmsg.close()
+        finally:
+            self.backend.unload(self.module_name)
+
+        interleaving, diverged, final_ok = check_log(self.model_cls, logged)
+        intended = [op for ops in schedule for op in ops]
+        applied = interleaving[:-1]
+        elapsed = max(end for _, end, _ in writers) - min(s for s, _, _ in writers)
+        return {
+            "module": self.module_name,
+            "kind": kind,
+            "workers": len(schedule),
+            "ops": len(intended),
+            "ops_per_sec": len(intended) / elapsed if elapsed > 0 else None,
+            "failed_writes": sum(failed for _, _, failed in writers),
+            # Logged stores missing, overwritten records or failed writes
+            "lost": len(intended) - len(applied),
+            # Stores applied with another writer's value
+            "torn": sum((Counter(intended) - Counter(applied)).values()),
+            "diverged": len(diverged),
+            "first_diverged": (
+                [diverged[0][0], format_op(diverged[0][1])] + list(diverged[0][2:])
+                if diverged
+                else None
+            ),
+            "final_ok": final_ok,
+            "final": logged[-1][2] if logged else [],
+            "schedule": schedule,
+            "interleaving": applied,
+        }
+
+
+def worker_counts(workers):
+    return sorted({1, 2, 4, workers})
+
+
+def print_run(r):
+    print(
+        f"{r['kind']:<10} {r['workers']:>7} {r['ops_per_sec'] or 0:>10.0f} "
+        f"{r['torn']:>6} {r['lost']:>6} {r['diverged']:>9}  "
+        f"{'OK' if r['final_ok'] else 'MISMATCH'}"
+    )
+
+
+def print_header():
+    print(
+        f"\n{'kind':<10} {'workers':>7} {'ops/s':>10} "
+        f"{'torn':>6} {'lost':>6} {'diverged':>9}  final"
+    )
+
+
+def run_contention(
+    backend, module_type, module_name, ops, workers, mix, kinds, output, seed=None
+):
+    """Throughput and final state at 1, 2, 4 and workers writers of each kind"""
+    if seed is None:
+        seed = random.randrange(2**32)
+    model_cls = MODELS[module_type]
+    mix_text = mix or CONTENTION_SPECS[module_type]["mix"]
+    parsed = parse_mix(mix_text, model_cls)
+    if "processes" in kinds and process_spec(backend) is None:
+        print("[!] Process writers need the kernel or a helper backend, skipped")
+        kinds = [kind for kind in kinds if kind != "processes"]
+
+    print(f"=== Contention {module_name}: {mix_text}, {ops} ops, seed {seed} ===")
+    runner = ContentionRun(backend, module_type, module_name)
+    results = []
+    print_header()
+    for kind in kinds:
+        for count in worker_counts(workers):
+            # Every run has its own stream, replayable alone with the same seed
+            rng = random.Random(f"{seed}:{module_type}:{kind}:{count}")
+            result = runner.run(kind, make_schedule(rng, parsed, count, ops))
+            result.update(seed=seed, mix=mix_text, type=module_type)
+            print_run(result)
+            results.append(result)
+
+    with open(output, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+    print(f"\nRuns with schedules and interleavings appended to {output}")
+    # Torn stores are the expected race of separate value and cmd writes,
+    # a module whose log does not replay on the model is broken
+    if all(r["diverged"] == 0 and r["final_ok"] for r in results):
+        print("\nFINAL RESULT: EVERY INTERLEAVING REPLAYED ON THE MODEL")
+        return 0
+    print("\nFINAL RESULT: SOME INTERLEAVINGS LEFT AN INCONSISTENT STATE")
+    return 1
+
+
+def replay(backend, path, module_name=None):
+    """Apply each recorded interleaving with one writer, compare final state"""
+    with open(path) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    failed = 0
+    print(f"=== Replaying {len(runs)} recorded interleavings from {path} ===")
+    print_header()
+    for recorded in runs:
+        module_type = recorded["type"]
+        runner = ContentionRun(backend, module_type, module_name or recorded["module"])
+        interleaving = [tuple(op) for op in recorded["interleaving"]]
+        result = runner.run("serial", [interleaving])
+        same = result["final"] == recorded["final"]
+        print_run(result)
+        print(
+            f"    seed {recorded['seed']} {recorded['kind']} x{recorded['workers']}: "
+            f"final state {'reproduced' if same else 'differs from recorded run'}"
+        )
+        if not same or not result["final_ok"]:
+            failed += 1
+    return 1 if failed else 0
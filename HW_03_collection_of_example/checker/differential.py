@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+import bisect
+import math
+import random
+import time
+from collections import Counter, deque, namedtuple
+
+from .kmsg import split_commands
+
+# Operations issued between two reads of the log, keeps well below ring size
+CHUNK = 256
+# Replays allowed while shrinking a failing sequence
+SHRINK_TRIALS = 500
+
+Mismatch = namedtuple("Mismatch", "index op expected actual")
+
+
+def s32(value):
+    return (value + 2**31) % 2**32 - 2**31
+
+
+class ReferenceModel:
+    """Python model of a module: expected log lines for every command"""
+
+    # Parameter taking the value ("{}" in cmd when the value is inline)
+    param = "value"
+    # (cmd, weight, takes value) for random sequences
+    ops = ()
+    # Values are drawn from range(domain) so that they collide
+    domain = 1000
+
+    def random_sequence(self, rng, count):
+        cmds = [(cmd, takes_value) for cmd, _, takes_value in self.ops]
+        weights = [weight for _, weight, _ in self.ops]
+        return [
+            (cmd, rng.randrange(self.domain) if takes_value else None)
+            for cmd, takes_value in rng.choices(cmds, weights, k=count)
+        ]
+
+    def apply(self, cmd, value):
+        return getattr(self, f"do_{cmd.replace(' {}', '')}")(value)
+
+    def normalize(self, line):
+        """Actual log line as the model predicts it"""
+        return line
+
+
+class ListModel(ReferenceModel):
+    ops = (
+        ("add", 5, True),
+        ("del", 3, True),
+        ("find", 3, True),
+        ("swap", 2, True),
+        ("reverse", 0.1, False),
+    )
+
+    def __init__(self):
+        self.items = []
+        self.counts = Counter()
+
+    def do_add(self, value):
+        self.items.append(value)
+        self.counts[value] += 1
+        return [f"Added item: {value}"]
+
+    def do_find(self, value):
+        found = "found" if self.counts[value] else "not found"
+        return [f"Item {value} {found} in list"]
+
+    def do_del(self, value):
+        if not self.counts[value]:
+            return [f"Item {value} not found in list"]
+        self.items.remove(value)
+        self.counts[value] -= 1
+        return [f"Deleted item: {value}"]
+
+    def do_print(self, value):
+        if not self.items:
+            return ["List is empty"]
+        items = "".join(f" {item}" for item in self.items)
+        return [f"List contents:{items}"]
+
+    def do_reverse(self, value):
+        self.items.reverse()
+        return ["List reversed"]
+
+    def do_swap(self, value):
+        try:
+            i = self.items.index(value, 0, len(self.items) - 1)
+        except ValueError:
+            return [f"Item {value} not found or is last in list"]
+        items = self.items
+        items[i], items[i + 1] = items[i + 1], items[i]
+        return [f"Swapped items: {items[i]} and {items[i + 1]}"]
+
+
+class QueueModel(ReferenceModel):
+    ops = (
+        ("enqueue", 5, True),
+        ("dequeue", 4, False),
+        ("peek", 1, False),
+        ("total", 1, False),
+        ("clear", 0.05, False),
+    )
+    MAX_QUEUE_SIZE = 32
+    # kfifo is allocated for MAX_QUEUE_SIZE * sizeof(int) elements
+    capacity = MAX_QUEUE_SIZE * 4
+
+    def __init__(self):
+        self.fifo = deque()
+        self.total = 0
+
+    def do_enqueue(self, value):
+        if len(self.fifo) >= self.capacity:
+            return [
+                f"Queue max size {self.MAX_QUEUE_SIZE} reached! Cannot enqueue {value}"
+            ]
+        self.fifo.append(value)
+        self.total = s32(self.total + value)
+        return [f"Enqueued: {value}"]
+
+    def do_dequeue(self, value):
+        if not self.fifo:
+            return ["Queue is empty"]
+        item = self.fifo.popleft()
+        self.total = s32(self.total - item)
+        return [f"Dequeued: {item}"]
+
+    def do_peek(self, value):
+        return [f"Front item: {self.fifo[0]}" if self.fifo else "Queue is empty"]
+
+    def do_print(self, value):
+        if not self.fifo:
+            return ["Queue is empty"]
+        items = "".join(f" {item}" for item in self.fifo)
+        return [f"Queue contents (front to back):{items}"]
+
+    def do_total(self, value):
+        return [f"Sum of values: {self.total}"]
+
+    def do_clear(self, value):
+        # Only the kfifo is reset, the sum is kept
+        self.fifo.clear()
+        return ["Queue cleared"]
+
+
+class StackModel(ReferenceModel):
+    ops = (
+        ("push", 5, True),
+        ("pop", 4, False),
+        ("clear", 0.05, False),
+    )
+
+    def __init__(self):
+        self.stack = []
+
+    def do_push(self, value):
+        self.stack.append(value)
+        return [f"Pushed: {value}"]
+
+    def do_pop(self, value):
+        if not self.stack:
+            return ["Stack underflow"]
+        return [f"Popped: {self.stack.pop()}"]
+
+    def do_print(self, value):
+        if not self.stack:
+            return ["Stack is empty"]
+        items = "".join(f" {item}" for item in reversed(self.stack))
+        return [f"Stack contents (top to bottom):{items}"]
+
+    def do_clear(self, value):
+        lines = [f"Popped: {item}" for item in reversed(self.stack)]
+        self.stack.clear()
+        return lines + ["Stack cleared"]
+
+
+class Stack2Model(StackModel):
+    param = None
+    ops = (
+        ("push {}", 5, True),
+        ("pop", 4, False),
+        ("top", 1, False),
+        ("size", 1, False),
+        ("clear", 0.05, False),
+    )
+
+    def do_top(self, value):
+        return [f"Stack top: {self.stack[-1]}" if self.stack else "Stack is empty"]
+
+    def do_size(self, value):
+        return [f"Stack size: {len(self.stack)}"]
+
+
+class RBTreeModel(ReferenceModel):
+    ops = (
+        ("insert", 5, True),
+        ("delete", 3, True),
+        ("find", 3, True),
+        ("print", 0.01, False),
+        ("clear", 0.005, False),
+    )
+
+    def __init__(self):
+        self.keys = []
+
+    def _index(self, value):
+        i = bisect.bisect_left(self.keys, value)
+        return i if i < len(self.keys) and self.keys[i] == value else None
+
+    def do_insert(self, value):
+        if self._index(value) is not None:
+            return [f"Insert failed, item {value} already exist in tree"]
+        bisect.insort(self.keys, value)
+        return [f"Inserted: {value}"]
+
+    def do_delete(self, value):
+        i = self._index(value)
+        if i is None:
+            return []
+        del self.keys[i]
+        return [f"Deleted: {value}"]
+
+    def do_find(self, value):
+        found = self._index(value) is not None
+        return [f"Found: {value}" if found else f"Not found: {value}"]
+
+    def do_print(self, value):
+        if not self.keys:
+            return ["Tree is empty"]
+        return ["RB-Tree contents (in-order):"] + [str(key) for key in self.keys]
+
+    def do_clear(self, value):
+        self.keys.clear()
+        return ["Tree cleared"]
+
+    def normalize(self, line):
+        # Node colors depend on rebalancing, only the order is modeled
+        return line.split(" (", 1)[0] if line.endswith(("(red)", "(black)")) else line
+
+
+class BinTreeModel(ReferenceModel):
+    ops = (
+        ("insert", 5, True),
+        ("delete", 4, True),
+    )
+
+    def __init__(self):
+        # Node links by key, None key stands for the root link
+        self.left = {}
+        self.right = {}
+        self.parent = {}
+        self.root = None
+        for data in (50, 30, 20, 40, 70, 60, 80):
+            self.do_insert(data)
+
+    def _link(self, parent, child, old):
+        """Point the link of parent that held old at child"""
+        if parent is None:
+            self.root = child
+        elif self.left[parent] == old:
+            self.left[parent] = child
+        else:
+            self.right[parent] = child
+        if child is not None:
+            self.parent[child] = parent
+
+    def do_insert(self, value):
+        if value in self.parent:
+            return []
+        parent, node = None, self.root
+        while node is not None:
+            parent = node
+            node = self.left[node] if value < node else self.right[node]
+        self.left[value] = self.right[value] = None
+        self.parent[value] = parent
+        if parent is None:
+            self.root = value
+        elif value < parent:
+            self.left[parent] = value
+        else:
+            self.right[parent] = value
+        return [f"Inserted node: {value}"]
+
+    def do_delete(self, value):
+        if value not in self.parent:
+            return [f"Node {value} not found for deletion"]
+        left, right = self.left.pop(value), self.right.pop(value)
+        parent = self.parent.pop(value)
+        if left is None or right is None:
+            # Only the two children case is reported
+            self._link(parent, left if right is None else right, value)
+            return []
+
+        # Successor data moves into the node, successor node goes away
+        succ = right
+        while self.left[succ] is not None:
+            succ = self.left[succ]
+        if succ == right:
+            right = self.right[succ]
+        else:
+            self._link(self.parent[succ], self.right[succ], succ)
+        self._link(parent, succ, value)
+        self.left[succ], self.right[succ] = left, right
+        self.parent[left] = succ
+        if right is not None:
+            self.parent[right] = succ
+        return [f"Deleted node: {value}"]
+
+
+MODELS = {
+    "list": ListModel,
+    "queue": QueueModel,
+    "stack": StackModel,
+    "stack2": Stack2Model,
+    "rb_tree": RBTreeModel,
+    "bin_tree": BinTreeModel,
+}
+
+
+class DifferentialTester:
+    """Replay operation sequences on a module and its reference model"""
+
+    def __init__(self, backend, module_type, module_name):
+        self.backend = backend
+        self.model_cls = MODELS[module_type]
+        self.module_name = module_name
+        self.kmsg = backend.open_log()
+        self.runs = 0
+
+    def issue(self, param, cmd, value, last):
+        if "{}" in cmd:
+            cmd = cmd.format(value)
+        elif param is not None and value is not None and last.get(param) != value:
+            self.backend.set_parameter(self.module_name, param, value)
+            last[param] = value
+        self.backend.set_parameter(self.module_name, "cmd", cmd)
+
+    def run_sequence(self, sequence):
+        """Run sequence on a freshly loaded module, return first Mismatch or None"""
+        self.runs += 1
+        model = self.model_cls()
+        prefix_len = len(self.module_name) + 2
+        self.backend.load(self.module_name)
+        try:
+            self.kmsg.clear()
+            last = {}
+            for start in range(0, len(sequence), CHUNK):
+                chunk = sequence[start : start + CHUNK]
+                for cmd, value in chunk:
+                    self.issue(model.param, cmd, value, last)
+                groups = split_commands(self.kmsg.read_available(), self.module_name)
+                self.kmsg.discard()
+                if len(groups) != len(chunk):
+                    raise RuntimeError(
+                        f"{len(chunk)} commands issued, {len(groups)} logged"
+                    )
+                for i, (op, group) in enumerate(zip(chunk, groups)):
+                    expected = model.apply(*op)
+                    actual = [
+                        model.normalize(record.text[prefix_len:])
+                        for record in group[1:]
+                        if not record.text[prefix_len:].startswith("Executing command:")
+                    ]
+                    if actual != expected:
+                        return Mismatch(start + i, op, expected, actual)
+            return None
+        finally:
+            self.backend.unload(self.module_name)
+
+    def shrink(self, sequence, mismatch):
+        """Delta debugging: drop chunks of operations while the run still fails"""
+        sequence = sequence[: mismatch.index + 1]
+        parts = 2
+        trials = 0
+        while len(sequence) > 1 and trials < SHRINK_TRIALS:
+            size = math.ceil(len(sequence) / parts)
+            for start in range(0, len(sequence), size):
+                candidate = sequence[:start] + sequence[start + size :]
+                trials += 1
+                result = self.run_sequence(candidate)
+                if result is not None:
+                    sequence, mismatch = candidate[: result.index + 1], result
+                    parts = max(parts - 1, 2)
+                    break
+                if trials >= SHRINK_TRIALS:
+                    break
+            else:
+                if parts >= len(sequence):
+                    break
+                parts = min(parts * 2, len(sequence))
+        return sequence, mismatch
+
+
+def format_op(op):
+    cmd, value = op
+    if value is None:
+        return cmd
+    return cmd.format(value) if "{}" in cmd else f"{cmd} {value}"
+
+
+def run_differential(backend, modules, ops, seed=None):
+    """Check (module_type, module_name) pairs on random sequences, 0 if all match"""
+    if seed is None:
+        seed = random.randrange(2**32)
+    failed = 0
+    for module_type, module_name in modules:
+        # Each module gets its own stream so a sequence is replayable alone
+        rng = random.Random(f"{seed}:{module_type}")
+        tester = DifferentialTester(backend, module_type, module_name)
+        sequence = tester.model_cls().random_sequence(rng, ops)
+        print(f"\n=== Differential Test {module_name} ({ops} ops, seed {seed}) ===")
+
+        start = time.monotonic()
+        mismatch = tester.run_sequence(sequence)
+        elapsed = time.monotonic() - start
+        if mismatch is None:
+            print(f"Result:     PASS  {ops / elapsed:.0f} ops/s")
+            continue
+
+        failed += 1
+        print(f"Mismatch at op #{mismatch.index}: {format_op(mismatch.op)}")
+        print("Shrinking...")
+        sequence, mismatch = tester.shrink(sequence, mismatch)
+        print(f"Minimal reproducer ({len(sequence)} ops, {tester.runs} runs):")
+        for op in sequence:
+            print(f"  {format_op(op)}")
+        print(f"Expected:   {mismatch.expected}")
+        print(f"Found:      {mismatch.actual}")
+        print("Result:     FAIL")
+
+    if failed == 0:
+        print("\nFINAL RESULT: ALL SEQUENCES MATCHED")
+        return 0
+    print("\nFINAL RESULT: SOME SEQUENCES DIVERGED")
+    return 1
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+import argparse
+import atexit
+import errno
+import json
+import os
+import re
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .kmsg import KmsgReader, KmsgRecord, ModuleFilter
+
+# Time allowed for a spawned helper to create its socket
+SPAWN_TIMEOUT = 10.0
+# Module and parameter names accepted from clients, they end up in paths and argv
+NAME_RE = re.compile(r"[A-Za-z0-9_]+")
+
+
+def default_socket(simulate=False):
+    """Socket path of the invoking user, same under sudo and without it"""
+    uid = os.environ.get("SUDO_UID", os.getuid())
+    name = f"kern-checker-{uid}{'-sim' if simulate else ''}.sock"
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+class HelperHandler(socketserver.StreamRequestHandler):
+    """One client connection: JSON request per line, JSON response per line"""
+
+    def setup(self):
+        super().setup()
+        self.backend = self.server.backend
+        self.reader = None
+        self.filter = None
+
+    def handle(self):
+        for line in self.rfile:
+            request = json.loads(line)
+            try:
+                handler = getattr(self, f"op_{request['op']}")
+                response = {"ok": True, "result": handler(**request["args"])}
+            except OSError as e:
+                response = {"ok": False, "errno": e.errno, "error": e.strerror}
+            except Exception as e:
+                response = {"ok": False, "errno": None, "error": f"{e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+    def finish(self):
+        if self.reader is not None:
+            self.reader.close()
+        super().finish()
+
+    def check_name(self, name):
+        if not isinstance(name, str) or not NAME_RE.fullmatch(name):
+            raise OSError(errno.EINVAL, f"invalid name {name!r}")
+
+    def check_module(self, module, param=None):
+        """Reject anything but an installed module and a plain parameter name"""
+        self.check_name(module)
+        if not self.backend.module_installed(module):
+            raise OSError(errno.ENOENT, f"module {module} is not installed")
+        if param is not None:
+            self.check_name(param)
+
+    def op_installed(self, module):
+        self.check_name(module)
+        return self.backend.module_installed(module)
+
+    def op_module_file(self, module):
+        self.check_name(module)
+        return self.backend.module_file(module)
+
+    def op_digest(self, module):
+        self.check_module(module)
+        return self.backend.module_digest(module)
+
+    def op_slab_usage(self):
+        return self.backend.slab_usage()
+
+    def op_load(self, module):
+        self.check_module(module)
+        self.backend.load(module)
+
+    def op_unload(self, module):
+        self.check_module(module)
+        self.backend.unload(module)
+
+    def op_set(self, module, param, value):
+        self.check_module(module, param)
+        self.backend.set_parameter(module, param, value)
+
+    def op_get(self, module, param):
+        self.check_module(module, param)
+        return self.backend.get_parameter(module, param)
+
+    def op_open_log(self, prefix):
+        self.reader = self.backend.open_log()
+        self.filter = ModuleFilter(prefix) if prefix is not None else None
+
+    def op_clear(self):
+        self.reader.clear()
+
+    def op_read(self, timeout):
+        """New records, waits up to timeout when there are none yet"""
+        new = self.reader.read_available()
+        if not new and timeout > 0:
+            self.reader._wait(timeout)
+            new = self.reader.read_available()
+        # Only the client keeps records
+        self.reader.discard()
+        if self.filter is None:
+            return [[list(record), True] for record in new]
+        return [[list(record), owned] for record, owned in self.filter(new)]
+
+    def op_shutdown(self):
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class HelperServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, backend):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.backend = backend
+        super().__init__(path, HelperHandler)
+        os.chmod(path, 0o600)
+        # Under sudo the socket is handed to the user who asked for it
+        if "SUDO_UID" in os.environ:
+            os.chown(path, int(os.environ["SUDO_UID"]), int(os.environ["SUDO_GID"]))
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class HelperConnection:
+    """Client side of one helper connection, calls are serialized"""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.file = self.sock.makefile("rwb")
+        self.lock = threading.Lock()
+
+    def call(self, op, **args):
+        with self.lock:
+            self.file.write(json.dumps({"op": op, "args": args}).encode() + b"\n")
+            self.file.flush()
+            line = self.file.readline()
+        if not line:
+            raise RuntimeError("helper closed the connection")
+        response = json.loads(line)
+        if response["ok"]:
+            return response["result"]
+        if response["errno"] is not None:
+            raise OSError(response["errno"], response["error"])
+        raise RuntimeError(response["error"])
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class HelperLogReader(KmsgReader):
+    """KmsgReader fed by the helper, optionally limited to one module prefix"""
+
+    def __init__(self, path, prefix=None):
+        super().__init__(path=None)
+        self.conn = HelperConnection(path)
+        self.conn.call("open_log", prefix=prefix)
+
+    def read_available(self, timeout=0):
+        pairs = [
+            (KmsgRecord(*record), owned)
+            for record, owned in self.conn.call("read", timeout=timeout)
+        ]
+        new = [record for record, owned in pairs if owned]
+        self._collect(new, [record for record, _ in pairs])
+        return new
+
+    def clear(self):
+        self.conn.call("clear")
+        self.discard()
+
+    def _wait(self, timeout):
+        # Waiting happens in the helper, records it returns are kept
+        self.read_available(timeout)
+
+    def close(self):
+        self.conn.close()
+
+
+class HelperDemux:
+    """Every channel is a helper connection filtered by module prefix"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def channel(self, module_name):
+        return HelperLogReader(self.path, prefix=f"{module_name}: ")
+
+    def pump(self):
+        pass
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class HelperBackend:
+    """Backend talking to a long-lived helper, spawned on first use if needed"""
+
+    name = "helper"
+
+    def __init__(self, path=None, simulate=False, defines=None):
+        self.path = path or default_socket(simulate)
+        self.proc = None
+        try:
+            self.conn = HelperConnection(self.path)
+        except OSError:
+            self.conn = self.spawn(simulate, defines)
+
+    def spawn(self, simulate, defines):
+        """Start helper once: under sudo for the kernel, as is for the simulator"""
+        cmd = [sys.executable, "-m", "checker.helper", "--socket", self.path]
+        if simulate:
+            cmd.append("--simulate")
+            for name, value in (defines or {}).items():
+                cmd += ["--define", f"{name}={value}"]
+        elif os.geteuid() != 0:
+            cmd.insert(0, "sudo")
+        top = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.proc = subprocess.Popen(cmd, cwd=top)
+        atexit.register(self.shutdown)
+
+        deadline = time.monotonic() + SPAWN_TIMEOUT
+        while True:
+            try:
+                return HelperConnection(self.path)
+            except OSError:
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"helper did not start on {self.path}")
+                time.sleep(0.05)
+
+    def shutdown(self):
+        """Stop helper this backend spawned, a shared one keeps running"""
+        if self.proc is not None:
+            self.conn.call("shutdown")
+            self.proc.wait()
+            self.proc = None
+
+    def module_installed(self, module_name):
+        return self.conn.call("installed", module=module_name)
+
+    def module_file(self, module_name):
+        return self.conn.call("module_file", module=module_name)
+
+    def module_digest(self, module_name):
+        return self.conn.call("digest", module=module_name)
+
+    def slab_usage(self):
+        return self.conn.call("slab_usage")
+
+    def load(self, module_name):
+        self.conn.call("load", module=module_name)
+
+    def unload(self, module_name):
+        self.conn.call("unload", module=module_name)
+
+    def set_parameter(self, module_name, param, value):
+        self.conn.call("set", module=module_name, param=param, value=value)
+
+    def get_parameter(self, module_name, param):
+        return self.conn.call("get", module=module_name, param=param)
+
+    def open_log(self):
+        return HelperLogReader(self.path)
+
+    def open_demux(self):
+        return HelperDemux(self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Privileged helper: module load/unload, parameters and kmsg"
+    )
+    parser.add_argument("--socket", help="Unix socket path (default: per user)")
+    parser.add_argument(
+        "--simulate",
+        action="store_true",
+        help="Serve the in-process simulator instead of the kernel, no root needed",
+    )
+    parser.add_argument(
+        "--define",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Build time constant of simulated modules",
+    )
+    args = parser.parse_args()
+
+    if args.simulate:
+        from .simulator import SimulatedBackend
+
+        defines = {}
+        for define in args.define:
+            name, _, value = define.partition("=")
+            defines[name] = int(value)
+        backend = SimulatedBackend(defines=defines)
+    else:
+        from .backend import KernelBackend
+
+        backend = KernelBackend()
+
+    path = args.socket or default_socket(args.simulate)
+    with HelperServer(path, backend) as server:
+        print(f"[+] Helper listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+import errno
+import gzip
+import os
+import re
+import select
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque, namedtuple
+
+# cont: record carries pr_cont() output that did not fit in the previous one
+KmsgRecord = namedtuple("KmsgRecord", "seq level ts_usec text cont", defaults=[False])
+
+# Non printable bytes are escaped by the kernel as \xNN
+ESCAPE_RE = re.compile(rb"\\x([0-9a-f]{2})")
+
+# Every parameter store logs itself first, a command store opens a group
+PARAM_RE = re.compile(r"Param (\w+) set to")
+
+# printk levels by name, lower is more severe
+LEVELS = {
+    "emerg": 0,
+    "alert": 1,
+    "crit": 2,
+    "err": 3,
+    "warn": 4,
+    "notice": 5,
+    "info": 6,
+    "debug": 7,
+}
+
+# Failure log limits per suite, and foreign records kept around module ones
+RING_RECORDS = 2000
+RING_BYTES = 256 * 1024
+RING_CONTEXT = 3
+
+
+def parse_record(raw):
+    """Parse one /dev/kmsg record: 'prio,seq,ts_usec,flags;text\\n[ KEY=val\\n]'"""
+    header, _, body = raw.partition(b";")
+    fields = header.split(b",")
+    text = body.split(b"\n", 1)[0]
+    text = ESCAPE_RE.sub(lambda m: bytes([int(m.group(1), 16)]), text)
+    return KmsgRecord(
+        seq=int(fields[1]),
+        level=int(fields[0]) & 7,
+        ts_usec=int(fields[2]),
+        text=text.decode(errors="replace"),
+        cont=fields[3].startswith(b"c"),
+    )
+
+
+def split_commands(records, module_name):
+    """Group records of the module by the cmd store that produced them"""
+    prefix = f"{module_name}: "
+    groups, group, owned = [], None, False
+    for record in records:
+        if record.cont:
+            # Continuation has no prefix, it belongs to the record before it
+            if owned and group is not None:
+                group.append(record)
+            continue
+        owned = record.text.startswith(prefix)
+        if not owned:
+            continue
+        match = PARAM_RE.search(record.text)
+        if match:
+            group = [record] if match.group(1) == "cmd" else None
+            if group is not None:
+                groups.append(group)
+        elif group is not None:
+            group.append(record)
+    return groups
+
+
+def add_record(pairs, record, owned, foreign):
+    """Append (record, owned) to pairs, return the number of foreign records
+    pairs ends with. A LogRing keeps only the first and last few records of
+    a foreign run, the ones in between are left out."""
+    pairs.append((record, owned))
+    if owned:
+        return 0
+    if foreign >= 2 * RING_CONTEXT:
+        del pairs[-RING_CONTEXT - 1]
+        return foreign
+    return foreign + 1
+
+
+class ModuleFilter:
+    """Mark records of one module and the continuations following them,
+    foreign records are passed only as context for the failure log"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.owned = False
+
+    def __call__(self, records):
+        """(record, owned) pairs of records"""
+        pairs, foreign = [], 0
+        for record in records:
+            if not record.cont:
+                self.owned = record.text.startswith(self.prefix)
+            foreign = add_record(pairs, record, self.owned, foreign)
+        return pairs
+
+
+def record_prefix(text):
+    """pr_fmt prefix of a record, 'ex_queue' for 'ex_queue: Queue is empty'"""
+    head, sep, _ = text.partition(": ")
+    return head if sep and " " not in head else None
+
+
+class KmsgIndex:
+    """Records in parallel arrays, looked up by module prefix, seq and level.
+
+    Continuation records carry the prefix of the record they continue.
+    Records are appended in seq order and dropped from the front."""
+
+    def __init__(self):
+        self.seqs = array("q")
+        self.levels = array("b")
+        self.ts_usec = array("q")
+        self.conts = array("b")
+        self.texts = []
+        # Absolute positions of records by prefix, position of seqs[0]
+        self.by_prefix = {}
+        self.start = 0
+        self.owner = None
+
+    def __len__(self):
+        return len(self.seqs)
+
+    def __iter__(self):
+        for pos in range(self.start, self.start + len(self.seqs)):
+            yield self.record(pos)
+
+    def extend(self, records):
+        for record in records:
+            if not record.cont:
+                self.owner = record_prefix(record.text)
+            if self.owner is not None:
+                positions = self.by_prefix.get(self.owner)
+                if positions is None:
+                    positions = self.by_prefix[self.owner] = array("q")
+                positions.append(self.start + len(self.seqs))
+            self.seqs.append(record.seq)
+            self.levels.append(record.level)
+            self.ts_usec.append(record.ts_usec)
+            self.conts.append(record.cont)
+            self.texts.append(record.text)
+
+    def record(self, pos):
+        """KmsgRecord at absolute position pos"""
+        i = pos - self.start
+        return KmsgRecord(
+            self.seqs[i],
+            self.levels[i],
+            self.ts_usec[i],
+            self.texts[i],
+            bool(self.conts[i]),
+        )
+
+    def find(self, after=-1, prefix=None, max_level=7, regex=None, stop=None):
+        """(record, match) of the first record with seq > after, from prefix,
+        at level <= max_level and matching regex; (None, None) if there is none.
+        A record matching stop ends the search as (that record, None)."""
+        first = self.start + bisect_right(self.seqs, after)
+        if prefix is None:
+            candidates = range(first, self.start + len(self.seqs))
+        else:
+            positions = self.by_prefix.get(prefix, ())
+            candidates = positions[bisect_right(positions, first - 1) :]
+        for pos in candidates:
+            i = pos - self.start
+            if stop is not None and regex is not stop and stop.search(self.texts[i]):
+                return self.record(pos), None
+            if self.levels[i] <= max_level:
+                match = regex.search(self.texts[i]) if regex is not None else True
+                if match:
+                    return self.record(pos), match
+        return None, None
+
+    def continuation(self, after):
+        """Continuation records right after seq after"""
+        i = bisect_right(self.seqs, after)
+        records = []
+        while i < len(self.seqs) and self.conts[i]:
+            records.append(self.record(self.start + i))
+            i += 1
+        return records
+
+    def trim(self, upto):
+        """Drop records with seq <= upto"""
+        count = bisect_right(self.seqs, upto)
+        if not count:
+            return
+        del self.seqs[:count]
+        del self.levels[:count]
+        del self.ts_usec[:count]
+        del self.conts[:count]
+        del self.texts[:count]
+        self.start += count
+        for prefix, positions in list(self.by_prefix.items()):
+            del positions[: bisect_right(positions, self.start - 1)]
+            if not positions:
+                del self.by_prefix[prefix]
+
+    def clear(self):
+        self.trim(self.seqs[-1] if self.seqs else -1)
+        self.owner = None
+
+
+class LogRing:
+    """Bounded window of recent records of one module, with a few records
+    logged right before and after them as context"""
+
+    def __init__(
+        self,
+        prefix,
+        max_records=RING_RECORDS,
+        max_bytes=RING_BYTES,
+        context=RING_CONTEXT,
+    ):
+        self.prefix = prefix
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.context = context
+        self.records = deque()
+        self.size = 0
+        self.dropped = 0
+        # Foreign records that may turn out to precede a module record
+        self.before = deque(maxlen=context)
+        # Foreign records still kept after the last module record
+        self.after = 0
+        self.owned = False
+
+    def extend(self, records):
+        for record in records:
+            if not record.cont:
+                self.owned = record.text.startswith(self.prefix)
+            if self.owned:
+                for previous in self.before:
+                    self._keep(previous)
+                self.before.clear()
+                self._keep(record)
+                self.after = self.context
+            elif self.after > 0:
+                self._keep(record)
+                self.after -= 1
+            else:
+                self.before.append(record)
+
+    def _keep(self, record):
+        self.records.append(record)
+        self.size += len(record.text)
+        while len(self.records) > self.max_records or self.size > self.max_bytes:
+            self.size -= len(self.records.popleft().text)
+            self.dropped += 1
+
+    def lines(self):
+        """dmesg-like lines, '...' marks records left out in between"""
+        seq = None
+        for record in self.records:
+            if seq is not None and record.seq != seq + 1:
+                yield "..."
+            seq = record.seq
+            yield f"[{record.ts_usec / 1e6:12.6f}] {record.text}"
+
+    def tail(self, count):
+        return "\n".join(list(self.lines())[-count:])
+
+    def text(self):
+        return "\n".join(self.lines())
+
+    def dump(self, path):
+        """Stream kept records to a gzip compressed file"""
+        with gzip.open(path, "wt") as f:
+            if self.dropped:
+                f.write(f"# {self.dropped} older records dropped\n")
+            for line in self.lines():
+                f.write(line + "\n")
+
+
+class KmsgReader:
+    """Follow /dev/kmsg with a cursor, each check scans only new records"""
+
+    def __init__(self, path="/dev/kmsg"):
+        self.path = path
+        self.fd = None
+        self.poller = None
+        # Records since last clear() not consumed by a match yet
+        self.index = KmsgIndex()
+        # Sequence number of the last consumed record
+        self.cursor = -1
+        # LogRing every new record is passed to, if any
+        self.ring = None
+
+    def _open(self):
+        self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self.poller = select.poll()
+        self.poller.register(self.fd, select.POLLIN)
+
+    def read_available(self):
+        """Read all records already in the ring buffer, never blocks"""
+        if self.fd is None:
+            self._open()
+        new = []
+        while True:
+            try:
+                raw = os.read(self.fd, 8192)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                # Records were overwritten before we read them, keep going
+                if e.errno == errno.EPIPE:
+                    continue
+                raise
+            if not raw:
+                break
+            new.append(parse_record(raw))
+        self._collect(new)
+        return new
+
+    def _collect(self, new, context=None):
+        """Keep new records for matching and in the failure ring, which
+        gets context instead when given: new and foreign records around"""
+        self.index.extend(new)
+        if self.ring is not None:
+            self.ring.extend(new if context is None else context)
+
+    def clear(self):
+        """Skip everything logged so far (replaces dmesg -C)"""
+        if self.fd is None:
+            self._open()
+        os.lseek(self.fd, 0, os.SEEK_END)
+        self.discard()
+
+    def discard(self):
+        """Forget records read so far, for callers consuming them directly"""
+        self.index.clear()
+
+    def text(self):
+        """Records not consumed by a match yet as dmesg-like text"""
+        self.read_available()
+        return "\n".join(self.index.texts)
+
+    def continuation(self):
+        """Text of continuation records right after the cursor, skips past them"""
+        self.read_available()
+        parts = self.index.continuation(self.cursor)
+        if parts:
+            self._consume(parts[-1].seq)
+        return "".join(record.text for record in parts)
+
+    def wait_for(self, pattern, timeout, prefix=None, max_level=7):
+        """Return first match after the cursor and advance it, None on timeout"""
+        return self.match_sequence([re.compile(pattern)], timeout, prefix, max_level)[0]
+
+    def match_sequence(self, regexes, timeout, prefix=None, max_level=7, stop=None):
+        """Match regexes as ordered subsequence of new records in one pass,
+        only records from prefix at level <= max_level (one per regex when
+        a list) are considered. A regex is not searched past a record
+        matching stop, it gets None there without waiting."""
+        # A regex missing at deadline gets None, next one resumes after last match
+        deadline = time.monotonic() + timeout
+        if not isinstance(max_level, list):
+            max_level = [max_level] * len(regexes)
+        matches = []
+        after = self.cursor
+        for regex, level in zip(regexes, max_level):
+            while True:
+                self.read_available()
+                record, match = self.index.find(after, prefix, level, regex, stop)
+                if record is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._wait(remaining)
+            if match is not None:
+                after = record.seq
+            matches.append(match)
+        # Records before the cursor are never scanned again
+        self._consume(after)
+        return matches
+
+    def _consume(self, seq):
+        """Move the cursor to seq, drop records up to it"""
+        self.cursor = seq
+        self.index.trim(seq)
+
+    def _wait(self, timeout):
+        """Sleep in poll until kernel appends a record or timeout expires"""
+        self.poller.poll(timeout * 1000)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class KmsgChannel(KmsgReader):
+    """Records of one module routed by KmsgDemux, same interface as KmsgReader"""
+
+    def __init__(self, demux):
+        super().__init__(demux.path)
+        self.demux = demux
+        # (record, owned) pairs, foreign records only go to the ring
+        self.pending = []
+        # Foreign records at the end of pending
+        self.foreign = 0
+        self.cond = threading.Condition()
+
+    def push(self, record, owned=True):
+        """Queue a module record, or a foreign one as failure log context"""
+        with self.cond:
+            self.foreign = add_record(self.pending, record, owned, self.foreign)
+            if owned:
+                self.cond.notify()
+
+    def read_available(self):
+        with self.cond:
+            pending, self.pending, self.foreign = self.pending, [], 0
+        new = [record for record, owned in pending if owned]
+        self._collect(new, [record for record, _ in pending])
+        return new
+
+    def clear(self):
+        # Route what is already in the ring buffer before dropping it
+        self.demux.pump()
+        with self.cond:
+            self.pending.clear()
+            self.foreign = 0
+        self.discard()
+
+    def continuation(self):
+        # Whole line is in the ring buffer already, make sure it was routed
+        self.demux.pump()
+        return super().continuation()
+
+    def _wait(self, timeout):
+        with self.cond:
+            # Only foreign records pending, nothing to match yet
+            if len(self.pending) == self.foreign:
+                self.cond.wait(timeout)
+
+    def close(self):
+        pass
+
+
+class KmsgDemux:
+    """Single /dev/kmsg reader splitting the stream by pr_fmt module prefix"""
+
+    def __init__(self, path="/dev/kmsg"):
+        self.path = path
+        self.reader = KmsgReader(path)
+        self.channels = {}
+        self.lock = threading.Lock()
+        # Channel of the last routed record, gets continuations without prefix
+        self.last = None
+        self.thread = None
+        self.stop_r, self.stop_w = os.pipe()
+
+    def channel(self, module_name):
+        """Create channel receiving records prefixed with '<module_name>: '"""
+        channel = KmsgChannel(self)
+        self.channels[module_name] = channel
+        return channel
+
+    def pump(self):
+        """Read available records and hand them to their channels"""
+        with self.lock:
+            for record in self.reader.read_available():
+                if record.cont:
+                    channel = self.last
+                else:
+                    channel = self.channels.get(record.text.split(": ", 1)[0])
+                    self.last = channel
+                if channel is not None:
+                    channel.push(record)
+                else:
+                    # Context of whatever module caused it, like a WARN
+                    for channel in self.channels.values():
+                        channel.push(record, owned=False)
+            self.reader.discard()
+
+    def start(self):
+        self.reader.clear()
+        self.reader.poller.register(self.stop_r, select.POLLIN)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            events = self.reader.poller.poll()
+            if any(fd == self.stop_r for fd, _ in events):
+                return
+            self.pump()
+
+    def close(self):
+        if self.thread is not None:
+            os.write(self.stop_w, b"x")
+            self.thread.join()
+            self.thread = None
+        self.reader.close()
+        os.close(self.stop_r)
+        os.close(self.stop_w)
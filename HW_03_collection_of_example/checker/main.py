@@ -2,68 +2,416 @@
 import argparse
 import os
 import sys
+import time
 
 # Add path to test scripts
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from checker.list_tester import ListModuleTester
-from checker.queue_tester import QueueModuleTester
-from checker.rb_tree_tester import RB_TreeModuleTester
-from checker.bitmap_tester import BitmapModuleTester
-from checker.bin_search_tester import BSearchModuleTester
-from checker.bin_tree_tester import Bin_TreeModuleTester
-from checker.stack_tester import StackModuleTester
-from checker.brackets_tester import BracketModuleTester
-from checker.stack2_tester import Stack2ModuleTester
+from checker.backend import BACKENDS, get_backend
+from checker.base_tester import SCOPES
+from checker.cache import ResultCache
+from checker.registry import available_plans, get_tester, tester_types
 
 
 def main():
     """Main entry point for module testing"""
+    # Testers are imported only once selected, module types without a
+    # tester module are run from their plan file
+    testers = tester_types()
+    plans = available_plans()
+    module_types = testers + [t for t in plans if t not in testers]
+
     parser = argparse.ArgumentParser(description="Kernel module tester")
     parser.add_argument(
         "module_type",
-        choices=[
-            "list",
-            "queue",
-            "rb_tree",
-            "bitmap",
-            "bin_search",
-            "bin_tree",
-            "stack",
-            "brackets",
-            "stack2",
-        ],
-        help="Module type to test (list, queue, rb_tree, bitmap, bin_search, bin_tree, stack, brackets or stack2)",
-    )
-    parser.add_argument("module_name", help="Name of the kernel module to test")
+        choices=module_types + ["all"],
+        help="Module type to test or 'all'",
+    )
+    parser.add_argument(
+        "module_name",
+        nargs="?",
+        help="Name of the kernel module to test (default: ex_<module_type>)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of suites run in parallel for 'all' (default: all at once)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="kernel",
+        help="Run against real kernel, in-process simulator or through the "
+        "privileged helper serving either of them (default: kernel)",
+    )
+    parser.add_argument(
+        "--helper-socket",
+        default=None,
+        help="Socket of a running helper for --backend helper/helper-sim "
+        "(default: per-user socket, helper is started if absent)",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Run declarative plan checker/plans/<module_type>.json instead of tester class",
+    )
+    parser.add_argument(
+        "--scope",
+        choices=SCOPES,
+        default="run",
+        help="Keep modules loaded for the whole run, for one suite or reload "
+        "them for every test; tests in between start from a reset (default: run)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run suites even when a passing result of the same module, "
+        "tester and kernel is cached",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of cached suite results (default: ~/.cache/kern-checker)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running: re-test modules whenever their installed .ko changes",
+    )
+    parser.add_argument(
+        "--bench",
+        action="store_true",
+        help="Measure per-command throughput and latency instead of testing",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Compare modules with Python reference models on random sequences",
+    )
+    parser.add_argument(
+        "--ops",
+        type=int,
+        default=None,
+        help="Operations per command type for --bench (default: 1000), "
+        "sequence length for --diff (default: 10000), "
+        "writes per --contention run (default: 2000)",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=None,
+        help="Comma separated structure sizes for benchmark mode (default: 0,100,1000) "
+        "and scaling mode (default: 100,1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--bench-output",
+        default="benchmark.jsonl",
+        help="File the benchmark run is appended to (default: benchmark.jsonl)",
+    )
+    parser.add_argument(
+        "--soak",
+        action="store_true",
+        help="Run queue enqueue/dequeue/print/total for --duration at --rate, "
+        "sampling metrics into --soak-output",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=60,
+        help="Soak duration in seconds (default: 60)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=1000,
+        help="Soak target operations per second, 0 for unthrottled (default: 1000)",
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=5,
+        help="Seconds between soak samples (default: 5)",
+    )
+    parser.add_argument(
+        "--soak-output",
+        default="soak.csv",
+        help="CSV time series written by soak mode (default: soak.csv)",
+    )
+    parser.add_argument(
+        "--scaling",
+        action="store_true",
+        help="Compare bin_tree and rb_tree insert/find/delete at --sizes "
+        "with --orders of keys, rows written to --scaling-output",
+    )
+    parser.add_argument(
+        "--orders",
+        default="random,ascending,zigzag",
+        help="Comma separated key orders for --scaling (default: all three)",
+    )
+    parser.add_argument(
+        "--scaling-output",
+        default="scaling.csv",
+        help="CSV written by scaling mode (default: scaling.csv)",
+    )
+    parser.add_argument(
+        "--unsafe",
+        action="store_true",
+        help="Let --scaling build bin_tree deeper than its kernel stack allows",
+    )
+    parser.add_argument(
+        "--contention",
+        action="store_true",
+        help="Drive the module from 1, 2, 4 and --workers concurrent writers, "
+        "check every interleaving against the model",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Largest number of contention writers (default: CPU count)",
+    )
+    parser.add_argument(
+        "--mix",
+        default=None,
+        metavar="CMD:WEIGHT,...",
+        help="Contention command mix, as in 'push:1,pop:1' (default: per module)",
+    )
+    parser.add_argument(
+        "--pool",
+        choices=["threads", "processes", "both"],
+        default="both",
+        help="Contention writers as threads, processes or both (default: both)",
+    )
+    parser.add_argument(
+        "--contention-output",
+        default="contention.jsonl",
+        help="JSON lines with seeds, schedules and interleavings of contention "
+        "runs, appended to (default: contention.jsonl)",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="FILE",
+        default=None,
+        help="Apply interleavings recorded in FILE serially and compare final "
+        "state, module types are taken from the file",
+    )
+    parser.add_argument(
+        "--trace",
+        choices=["function_graph", "kprobe"],
+        default=None,
+        help="Time command handlers inside the kernel through tracefs and "
+        "report them with every test (needs root)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        metavar="FILE",
+        default=None,
+        help="Take in-kernel times from a recorded trace_pipe output instead",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for benchmark values and --diff sequences",
+    )
+    parser.add_argument(
+        "--define",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Build time constant of simulated modules, as in 'make NR_VAL=10000'",
+    )
     args = parser.parse_args()
 
-    # Initialize appropriate tester
-    testers = {
-        "list": ListModuleTester,
-        "queue": QueueModuleTester,
-        "rb_tree": RB_TreeModuleTester,
-        "bitmap": BitmapModuleTester,
-        "bin_search": BSearchModuleTester,
-        "bin_tree": Bin_TreeModuleTester,
-        "stack": StackModuleTester,
-        "brackets": BracketModuleTester,
-        "stack2": Stack2ModuleTester,
-    }
-    tester = testers[args.module_type](args.module_name)
-
-    # Verify module exists
-    if not os.path.exists(
-        f"/lib/modules/{os.uname().release}/extra/src/{args.module_name}.ko"
-    ):
-        print(f"[!] Error: Module file {args.module_name}.ko not found")
-        print(
-            "Please build and install the module first using 'make' & 'sudo make install'"
+    if args.module_type == "all":
+        if args.module_name:
+            parser.error("module_name can't be used with 'all'")
+        selected = list(plans) if args.plan else module_types
+    else:
+        if args.plan and args.module_type not in plans:
+            parser.error(f"no plan file for '{args.module_type}'")
+        selected = [args.module_type]
+
+    if args.watch and args.backend.endswith("sim"):
+        parser.error("--watch needs module files, not available with the simulator")
+    tracing = args.trace or args.trace_file
+    if tracing and args.module_type == "all":
+        parser.error("--trace and --trace-file time one suite at a time")
+    if args.trace and not args.trace_file and args.backend.endswith("sim"):
+        parser.error("--trace needs a kernel, use --trace-file with the simulator")
+
+    defines = {}
+    for define in args.define:
+        name, _, value = define.partition("=")
+        if not value.isdigit():
+            parser.error(f"--define expects NAME=VALUE, got '{define}'")
+        defines[name] = int(value)
+    backend = get_backend(args.backend, defines, args.helper_socket)
+    if args.soak:
+        from checker.soak import run_soak
+
+        if selected != ["queue"]:
+            parser.error("--soak is implemented for the queue module only")
+        module_name = args.module_name or "ex_queue"
+        if not backend.module_installed(module_name):
+            print(f"[!] Error: Module file {module_name}.ko not found")
+            exit(1)
+        exit(
+            run_soak(
+                backend,
+                module_name,
+                args.duration,
+                args.rate,
+                args.sample_interval,
+                args.soak_output,
+                args.seed,
+            )
+        )
+
+    if args.scaling:
+        from checker.scaling import ORDERS, SCALING_OPS, run_scaling
+
+        modules = [
+            (t, args.module_name or f"ex_{t}")
+            for t in (SCALING_OPS if args.module_type == "all" else selected)
+        ]
+        if any(t not in SCALING_OPS for t, _ in modules):
+            parser.error(f"--scaling takes one of: {', '.join(SCALING_OPS)}, all")
+        orders = args.orders.split(",")
+        if any(order not in ORDERS for order in orders):
+            parser.error(f"--orders takes: {', '.join(ORDERS)}")
+        for _, module_name in modules:
+            if not backend.module_installed(module_name):
+                print(f"[!] Error: Module file {module_name}.ko not found")
+                exit(1)
+        sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else None
+        exit(
+            run_scaling(
+                backend,
+                modules,
+                sizes,
+                orders,
+                args.scaling_output,
+                args.unsafe,
+                args.seed,
+            )
+        )
+
+    if args.contention or args.replay:
+        from checker.contention import CONTENTION_SPECS, replay, run_contention
+
+        if args.replay:
+            exit(replay(backend, args.replay, args.module_name))
+        if len(selected) != 1 or selected[0] not in CONTENTION_SPECS:
+            parser.error(f"--contention takes one of: {', '.join(CONTENTION_SPECS)}")
+        module_name = args.module_name or f"ex_{selected[0]}"
+        if not backend.module_installed(module_name):
+            print(f"[!] Error: Module file {module_name}.ko not found")
+            exit(1)
+        kinds = ["threads", "processes"] if args.pool == "both" else [args.pool]
+        try:
+            exit(
+                run_contention(
+                    backend,
+                    selected[0],
+                    module_name,
+                    args.ops or 2000,
+                    args.workers,
+                    args.mix,
+                    kinds,
+                    args.contention_output,
+                    args.seed,
+                )
+            )
+        except ValueError as e:
+            parser.error(f"--mix: {e}")
+
+    if args.bench or args.diff:
+        if args.bench:
+            from checker.benchmark import BENCH_SPECS as supported, run_benchmarks
+        else:
+            from checker.differential import MODELS as supported, run_differential
+        modules = [
+            (t, args.module_name or f"ex_{t}") for t in selected if t in supported
+        ]
+        if not modules:
+            parser.error(f"'{args.module_type}' is not supported in this mode")
+        for _, module_name in modules:
+            if not backend.module_installed(module_name):
+                print(f"[!] Error: Module file {module_name}.ko not found")
+                exit(1)
+        if args.diff:
+            exit(run_differential(backend, modules, args.ops or 10000, args.seed))
+        sizes = [int(size) for size in (args.sizes or "0,100,1000").split(",")]
+        exit(
+            run_benchmarks(
+                backend, modules, sizes, args.ops or 1000, args.bench_output, args.seed
+            )
         )
-        exit(1)
 
-    # Run tests
+    # Initialize appropriate testers
+    def make_tester(module_type):
+        if args.plan or module_type not in testers:
+            from checker.plan_engine import PlanModuleTester, load_plan
+
+            plan = load_plan(plans[module_type])
+            module_name = args.module_name or plan["module"]
+            tester = PlanModuleTester(module_name, backend, plan)
+        else:
+            module_name = args.module_name or f"ex_{module_type}"
+            tester = get_tester(module_type)(module_name, backend)
+        tester.scope = args.scope
+        return tester
+
+    tester_list = [make_tester(module_type) for module_type in selected]
+
+    # Verify modules exist
+    for tester in tester_list:
+        if not backend.module_installed(tester.module_name):
+            print(f"[!] Error: Module file {tester.module_name}.ko not found")
+            print(
+                "Please build and install the module first using 'make' & 'sudo make install'"
+            )
+            exit(1)
+
+    # Run tests, unless a passing result of the same key is cached
+    cache = ResultCache(backend, args.cache_dir, force=args.force)
+    if args.watch:
+        from checker.watch import run_watch
+
+        modules = {
+            tester.module_name: module_type
+            for tester, module_type in zip(tester_list, selected)
+        }
+        exit(run_watch(backend, modules, make_tester, args.jobs, cache))
+    if args.module_type == "all":
+        from checker.runner import run_parallel
+
+        exit(run_parallel(tester_list, args.jobs or len(tester_list), backend, cache))
+
+    tester = tester_list[0]
+    if tracing:
+        from checker.tracing import ModuleTracer
+
+        try:
+            tester.tracer = ModuleTracer(
+                tester.module_name, args.trace or "function_graph", args.trace_file
+            )
+        except RuntimeError as e:
+            print(f"[!] Error: {e}")
+            exit(1)
+    # A traced run is for its timings, a cached result has none
+    entry = None if tracing else cache.lookup(tester)
+    if entry is not None:
+        print(
+            f"[=] {tester.module_name} unchanged since passing run at "
+            f"{entry['timestamp']} ({entry['passed']}/{entry['tests']}), "
+            "use --force to run again"
+        )
+        exit(0)
+    start = time.monotonic()
     exit_code = tester.run_all_tests()
+    cache.record(tester, exit_code, time.monotonic() - start)
     exit(exit_code)
 
 
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import os
+
+# Most a sysfs show() callback returns
+PAGE_SIZE = 4096
+
+
+class ParamWriter:
+    """Write and read module parameters through sysfs descriptors kept open
+    per load"""
+
+    def __init__(self, sysfs_path, run_command):
+        self.sysfs_path = sysfs_path
+        self.run_command = run_command
+        self.fds = {}
+        self.read_fds = {}
+        self.fallback = set()
+
+    def _open(self, param):
+        """Open parameter file once, remember params that need the shell path"""
+        try:
+            fd = os.open(f"{self.sysfs_path}/{param}", os.O_WRONLY)
+        except PermissionError:
+            # Unprivileged run: keep using sudo tee for this parameter
+            self.fallback.add(param)
+            return None
+        self.fds[param] = fd
+        return fd
+
+    def write(self, param, value):
+        """Write value to parameter, return True if direct write was used"""
+        fd = self.fds.get(param)
+        if fd is None and param not in self.fallback:
+            fd = self._open(param)
+        if fd is None:
+            # Value goes in through stdin, nothing of it reaches argv
+            self.run_command(
+                ["sudo", "tee", f"{self.sysfs_path}/{param}"], input=f"{value}\n"
+            )
+            return False
+
+        # Same bytes as echo would produce, the store callback runs synchronously
+        os.pwrite(fd, f"{value}\n".encode(), 0)
+        return True
+
+    def read(self, param):
+        """Read parameter, show callback runs again for every pread at 0"""
+        fd = self.read_fds.get(param)
+        if fd is None:
+            fd = os.open(f"{self.sysfs_path}/{param}", os.O_RDONLY)
+            self.read_fds[param] = fd
+        return os.pread(fd, PAGE_SIZE, 0).decode()
+
+    def close(self):
+        """Close all opened parameter files (must be done before rmmod)"""
+        for fd in [*self.fds.values(), *self.read_fds.values()]:
+            os.close(fd)
+        self.fds.clear()
+        self.read_fds.clear()
+        self.fallback.clear()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import json
+import re
+from collections import namedtuple
+
+from .base_tester import COMMAND_RE, BaseModuleTester
+from .registry import available_plans
+
+# ${name} refers to a named group captured by an earlier expected pattern
+PLACEHOLDER_RE = re.compile(r"\$\{(\w+)\}")
+
+PlanStep = namedtuple("PlanStep", "section writes expect")
+PlanCheck = namedtuple("PlanCheck", "pattern msg regex")
+
+
+def load_plan(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _names(text):
+    return set(PLACEHOLDER_RE.findall(str(text)))
+
+
+def _substitute(text, captures):
+    return PLACEHOLDER_RE.sub(lambda m: captures[m.group(1)], str(text))
+
+
+def compile_plan(plan):
+    """Turn plan into batches of steps executed without waiting in between"""
+    batches = [[]]
+    pending = set()  # captures produced by the current batch
+    last = {}  # last value written to each parameter
+    for section in plan["sections"]:
+        for step in section["steps"]:
+            writes = list(step.get("params", {}).items())
+            if "cmd" in step:
+                writes.append(("cmd", step["cmd"]))
+
+            checks = []
+            for pattern, msg in step.get("expect", []):
+                regex = None if _names(pattern) else re.compile(pattern)
+                checks.append(PlanCheck(pattern, msg, regex))
+
+            used = set()
+            for param, value in writes:
+                used |= _names(value)
+            for check in checks:
+                used |= _names(check.pattern) | _names(check.msg)
+            if used & pending:
+                # Captured value is needed: verify what was issued so far first
+                batches.append([])
+                pending = set()
+                last = {}
+
+            # A parameter keeps its value, only commands are repeated
+            writes = [
+                (param, value)
+                for param, value in writes
+                if param == "cmd" or _names(value) or last.get(param) != value
+            ]
+            for param, value in writes:
+                last[param] = value
+            for check in checks:
+                pending |= set(re.compile(check.pattern).groupindex)
+            batches[-1].append(PlanStep(section["title"], writes, checks))
+    return [batch for batch in batches if batch]
+
+
+class PlanModuleTester(BaseModuleTester):
+    """Tester driven by a declarative plan file instead of code"""
+
+    def __init__(self, module_name, backend=None, plan=None):
+        super().__init__(module_name, backend)
+        self.plan = plan
+        # Optional [cmd, pattern] resetting the module between suites sharing it
+        if "reset" in plan:
+            self.RESET = tuple(plan["reset"])
+        self.batches = compile_plan(plan)
+        self.captures = {}
+
+    def sources(self):
+        return super().sources() + [json.dumps(self.plan, sort_keys=True).encode()]
+
+    def run_batch(self, batch):
+        """Issue all writes of the batch, then verify its patterns in one pass"""
+        for step in batch:
+            for param, value in step.writes:
+                self.set_parameter(param, _substitute(value, self.captures))
+
+        # Every cmd store record, then the patterns of its output: a pattern
+        # is matched only in the output of its own step's command
+        checks, regexes, slots = [], [], []
+        for step in batch:
+            regexes += [COMMAND_RE] * sum(param == "cmd" for param, _ in step.writes)
+            for check in step.expect:
+                check = check._replace(
+                    pattern=_substitute(check.pattern, self.captures)
+                )
+                checks.append((step.section, check))
+                slots.append(len(regexes))
+                regexes.append(check.regex or re.compile(check.pattern))
+        found = self.match_dmesg(regexes, stop=COMMAND_RE)
+        matches = [found[slot] for slot in slots]
+
+        section = None
+        for (step_section, check), match in zip(checks, matches):
+            if step_section != section:
+                section = step_section
+                print(f"\n--- {section} ---")
+            msg = _substitute(check.msg, self.captures)
+            self.report_assertion(check.pattern, msg, match)
+            if match:
+                self.captures.update(match.groupdict())
+
+    def test_plan_operations(self):
+        """Plan-defined test operations"""
+        print(f"\n=== {self.plan['title']} ===")
+        self.setup_module()
+
+        try:
+            for batch in self.batches:
+                self.run_batch(batch)
+
+        finally:
+            self.teardown_module()
+
+    def run_all_tests(self):
+        """Execute lifecycle and plan tests"""
+        return self.run_suite(self.test_plan_operations)
@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
+import re
+
 from .base_tester import BaseModuleTester
+from .registry import register
+
+MAX_QUEUE_SIZE = 32
+# kfifo_alloc() is given MAX_QUEUE_SIZE * sizeof(int) as element count
+QUEUE_CAPACITY = MAX_QUEUE_SIZE * 4
 
 
+@register("queue")
 class QueueModuleTester(BaseModuleTester):
+    # clear empties the kfifo but keeps the sum of values, tests reload instead
+    RESET = None
+
     def test_queue_operations(self):
         """Queue-specific test operations"""
         print("\n=== Queue Operation Tests ===")
-        self.clear_dmesg()
-        self.load_module()
+        self.setup_module()
 
         try:
             # Test enqueue operation
@@ -27,12 +37,9 @@ class QueueModuleTester(BaseModuleTester):
                 r"Front item: 10", "Peek should show first item 10"
             )
 
-            # Test print operation
-            print("\n--- Print Operation ---")
-            self.set_parameter("cmd", "print")
-            self.assert_dmesg_contains(
-                r"Queue contents.*10 20", "Queue should contain [10, 20]"
-            )
+            # Contents are read from the state parameter, not printed
+            print("\n--- Queue State ---")
+            self.assert_state([10, 20], "Queue should contain [10, 20]")
 
             # Test total operation
             print("\n--- Total Operation ---")
@@ -61,17 +68,71 @@ class QueueModuleTester(BaseModuleTester):
             self.assert_dmesg_contains(r"Queue cleared", "Clear queue")
 
         finally:
-            self.unload_module()
+            self.teardown_module()
+
+    def test_queue_full(self):
+        """Fill the kfifo, overflow it and print it while full"""
+        print("\n=== Full Queue Tests ===")
+        self.setup_module()
+
+        try:
+            print("\n--- Fill Queue ---")
+            values = list(range(1, QUEUE_CAPACITY + 1))
+            for value in values:
+                self.set_parameter("value", value)
+                self.set_parameter("cmd", "enqueue")
+            matches = self.match_dmesg(
+                [re.compile(rf": Enqueued: {value}$") for value in values]
+            )
+            self.assert_condition(
+                all(matches),
+                f"Enqueue {QUEUE_CAPACITY} items",
+                "Every item enqueued",
+            )
+            self.assert_state(
+                values, "Read full queue state", f"Items 1..{QUEUE_CAPACITY} in order"
+            )
+
+            self.set_parameter("value", 0)
+            self.set_parameter("cmd", "enqueue")
+            self.assert_dmesg_contains(
+                rf"Queue max size {MAX_QUEUE_SIZE} reached! Cannot enqueue 0",
+                "Enqueue into full queue",
+            )
+
+            # print takes every item out and puts it back
+            print("\n--- Print Full Queue ---")
+            self.set_parameter("cmd", "print")
+            match = self.assert_dmesg_contains(
+                r"Queue contents \(front to back\):(.*)", "Print full queue"
+            )
+            if match:
+                printed = (match.group(1) + self.kmsg.continuation()).split()
+                self.assert_condition(
+                    printed == [str(value) for value in values],
+                    "Check printed queue",
+                    f"Items 1..{QUEUE_CAPACITY} in order",
+                )
+
+            self.set_parameter("cmd", "total")
+            self.assert_dmesg_contains(
+                rf"Sum of values: {sum(values)}$", "Sum of full queue"
+            )
+
+            print("\n--- Dequeue From Full Queue ---")
+            self.set_parameter("cmd", "dequeue")
+            self.assert_dmesg_contains(
+                r"Dequeued: 1$", "Print keeps order, front item is still 1"
+            )
+            self.set_parameter("value", 500)
+            self.set_parameter("cmd", "enqueue")
+            self.assert_dmesg_contains(
+                r"Enqueued: 500", "Enqueue after freeing one slot"
+            )
+
+        finally:
+            self.teardown_module()
 
     def run_all_tests(self):
         """Execute all queue module tests"""
-        try:
-            self.test_module_lifecycle()
-            self.test_queue_operations()
-            return self.print_summary()
-        except Exception as e:
-            print(f"\n[!] Test error: {e}")
-            with open("dmesg_failure.log", "w") as f:
-                f.write(self.get_dmesg_output())
-            print("Debug info saved to dmesg_failure.log")
-            return 1
+        return self.run_suite(self.test_queue_operations, self.test_queue_full)
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 from .base_tester import BaseModuleTester
+from .registry import register
 
 
+@register("rb_tree")
 class RB_TreeModuleTester(BaseModuleTester):
+    RESET = ("clear", r"Tree cleared")
+
     def test_tree_operations(self):
         """RB-tree specific test operations"""
         print("\n=== RB-Tree Operation Tests ===")
-        self.clear_dmesg()
-        self.load_module()
+        self.setup_module()
 
         try:
             # Test insert
@@ -39,12 +42,9 @@ class RB_TreeModuleTester(BaseModuleTester):
             self.set_parameter("cmd", "find")
             self.assert_dmesg_contains(r"Not found: 99", "Find non-existent node")
 
-            # Test print
-            print("\n--- Print Operation ---")
-            self.set_parameter("cmd", "print")
-            self.assert_dmesg_contains(r"Tree contents", "Print rb_tree structure")
-            self.assert_dmesg_contains(r"50", "Verify root node in output")
-            self.assert_dmesg_contains(r"red|black", "Verify color markers")
+            # Contents are read from the state parameter, not printed
+            print("\n--- Tree State ---")
+            self.assert_state([30, 50, 70], "Verify tree contents in order")
 
             # Test delete
             print("\n--- Delete Operation ---")
@@ -63,20 +63,10 @@ class RB_TreeModuleTester(BaseModuleTester):
             self.assert_dmesg_contains(r"Tree cleared", "Clear rb_tree")
 
             # Verify empty rb_tree
-            self.set_parameter("cmd", "print")
-            self.assert_dmesg_contains(r"Tree is empty", "Verify empty rb_tree")
+            self.assert_state([], "Verify empty rb_tree")
 
         finally:
-            self.unload_module()
+            self.teardown_module()
 
     def run_all_tests(self):
-        try:
-            self.test_module_lifecycle()
-            self.test_tree_operations()
-            return self.print_summary()
-        except Exception as e:
-            print(f"\n[!] Test error: {e}")
-            with open("dmesg_failure.log", "w") as f:
-                f.write(self.get_dmesg_output())
-            print("Debug info saved to dmesg_failure.log")
-            return 1
+        return self.run_suite(self.test_tree_operations)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+import importlib
+import os
+
+CHECKER_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAN_DIR = os.path.join(CHECKER_DIR, "plans")
+TESTER_SUFFIX = "_tester.py"
+
+# Tester classes by module type, filled in as their modules get imported
+TESTERS = {}
+
+
+def register(module_type):
+    """Class decorator registering a tester class for module_type"""
+
+    def decorator(cls):
+        TESTERS[module_type] = cls
+        return cls
+
+    return decorator
+
+
+def tester_types():
+    """Module types with a checker/<type>_tester.py, none of them is imported"""
+    return sorted(
+        name[: -len(TESTER_SUFFIX)]
+        for name in os.listdir(CHECKER_DIR)
+        if name.endswith(TESTER_SUFFIX) and name != "base" + TESTER_SUFFIX
+    )
+
+
+def get_tester(module_type):
+    """Tester class of module_type, its module is imported on first use"""
+    if module_type not in TESTERS:
+        importlib.import_module(f".{module_type}_tester", __package__)
+    return TESTERS[module_type]
+
+
+def available_plans():
+    """Plan files from checker/plans by module type"""
+    return {
+        name[: -len(".json")]: os.path.join(PLAN_DIR, name)
+        for name in sorted(os.listdir(PLAN_DIR))
+        if name.endswith(".json")
+    }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .base_tester import share_fixtures
+
+
+class ThreadOutput:
+    """sys.stdout replacement keeping output of each worker thread apart"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def capture(self):
+        self.local.buffer = io.StringIO()
+
+    def release(self):
+        text = self.local.buffer.getvalue()
+        del self.local.buffer
+        return text
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None:
+            return self.stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _run_tester(tester, output):
+    """Worker: run one suite with its output captured"""
+    output.capture()
+    start = time.monotonic()
+    try:
+        exit_code = tester.run_all_tests()
+    except Exception as e:
+        print(f"\n[!] Runner error: {e}")
+        exit_code = 1
+    return exit_code, output.release(), time.monotonic() - start
+
+
+def _run_group(testers, channel, output):
+    """Worker: run suites of one module one after another on its channel"""
+    results = []
+    for tester in testers:
+        tester.kmsg = channel
+        results.append((tester, *_run_tester(tester, output)))
+    return results
+
+
+def run_parallel(testers, jobs, backend, cache=None, demux=None):
+    """Run testers concurrently, one kmsg stream is split between them.
+    Suites of the same module run one after another, run scoped ones on
+    one load of it. Suites with a passing result in cache are not run
+    again, a running demux passed in is reused and left open."""
+    cached = {}
+    if cache is not None:
+        for tester in testers:
+            entry = cache.lookup(tester)
+            if entry is not None:
+                cached[id(tester)] = entry
+    pending = [tester for tester in testers if id(tester) not in cached]
+    share_fixtures(pending)
+    groups = {}
+    for tester in pending:
+        groups.setdefault(tester.module_name, []).append(tester)
+
+    own_demux = demux is None
+    if own_demux:
+        demux = backend.open_demux()
+    channels = {name: demux.channel(name) for name in groups}
+
+    output = ThreadOutput(sys.stdout)
+    results = {}
+    start = time.monotonic()
+    if own_demux:
+        demux.start()
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=max(min(jobs, len(groups)), 1)) as pool:
+            futures = [
+                pool.submit(_run_group, group, channels[name], output)
+                for name, group in groups.items()
+            ]
+            for future in as_completed(futures):
+                for tester, exit_code, text, elapsed in future.result():
+                    results[id(tester)] = (exit_code, elapsed)
+                    if cache is not None:
+                        cache.record(tester, exit_code, elapsed)
+                    output.stream.write(f"\n##### {tester.module_name} #####\n{text}")
+    finally:
+        sys.stdout = output.stream
+        if own_demux:
+            demux.close()
+
+    print("\n=== Parallel Run Summary ===")
+    for tester in testers:
+        entry = cached.get(id(tester))
+        if entry is not None:
+            print(
+                f"{tester.module_name:<16} PASS  {entry['passed']}/{entry['tests']}"
+                f"  cached {entry['timestamp']}"
+            )
+            continue
+        exit_code, elapsed = results[id(tester)]
+        print(
+            f"{tester.module_name:<16} {'PASS' if exit_code == 0 else 'FAIL'}"
+            f"  {tester.passed_count}/{tester.test_count}  {elapsed:.2f}s"
+        )
+    print(f"Total time: {time.monotonic() - start:.2f}s")
+
+    if all(exit_code == 0 for exit_code, _ in results.values()):
+        print("\nFINAL RESULT: ALL SUITES PASSED")
+        return 0
+    print("\nFINAL RESULT: SOME SUITES FAILED")
+    return 1
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+import csv
+import random
+import time
+
+from .benchmark import KEY_BASE, ModuleBenchmark, percentiles
+
+SCALING_SIZES = [100, 1000, 10000, 100000]
+ORDERS = ["random", "ascending", "zigzag"]
+# Commands timed per module: (reported name, command)
+SCALING_OPS = {
+    "rb_tree": [("insert", "insert"), ("find", "find"), ("delete", "delete")],
+    # No find command, inserting a present key walks the same path and stops
+    "bin_tree": [("insert", "insert"), ("find", "insert"), ("delete", "delete")],
+}
+# Preloaded 50, 30, 20, 40, 70, 60, 80 put keys above KEY_BASE under 50-70-80
+BIN_TREE_PRELOAD_DEPTH = 3
+# insert_node(), delete_node() and free_tree() recurse once per level on a
+# 16 KiB kernel stack already used by the sysfs store path and printk
+BIN_TREE_MAX_DEPTH = 128
+
+COLUMNS = [
+    "module",
+    "order",
+    "size",
+    "op",
+    "ops",
+    "height",
+    "total_ms",
+    "ops_per_sec",
+    "mean_us",
+    "p50_us",
+    "p95_us",
+    "p99_us",
+    "max_us",
+    "kmsg_p50_us",
+    "slab_bytes",
+    "slab_cache",
+    "skipped",
+]
+
+
+def key_order(order, size, rng):
+    """Keys 0..size-1 in insert order"""
+    if order == "random":
+        return rng.sample(range(size), size)
+    if order == "ascending":
+        return list(range(size))
+    # 0, n-1, 1, n-2, ...: every key lands between the last two, a deep zig-zag
+    keys = []
+    low, high = 0, size - 1
+    while low <= high:
+        keys.append(low)
+        if low != high:
+            keys.append(high)
+        low, high = low + 1, high - 1
+    return keys
+
+
+def bst_height(keys, limit):
+    """Height of the unbalanced BST keys build, None once it is past limit"""
+    root = None
+    left, right = {}, {}
+    height = 0
+    for key in keys:
+        if root is None:
+            root, height = key, 1
+            continue
+        node, depth = root, 1
+        while True:
+            depth += 1
+            links = left if key < node else right
+            if node not in links:
+                links[node] = key
+                break
+            node = links[node]
+        height = max(height, depth)
+        if height > limit:
+            return None
+    return height
+
+
+def slab_growth(before, after):
+    """Net bytes allocated between two slab snapshots and the cache that grew most"""
+    if before is None or after is None:
+        return None, None
+    growth = {name: after.get(name, 0) - before.get(name, 0) for name in after}
+    cache = max(growth, key=growth.get, default=None)
+    return sum(growth.values()), cache
+
+
+class ScalingBenchmark(ModuleBenchmark):
+    """Insert, find and delete size keys in one order, time every command"""
+
+    def run_phase(self, cmd, keys):
+        self.kmsg.clear()
+        self.groups = []
+        user_us = []
+        start = time.perf_counter()
+        for i, key in enumerate(keys):
+            user_us.append(self.issue(cmd, KEY_BASE + key))
+            if i % 256 == 255:
+                self.collect()
+        total = time.perf_counter() - start
+        self.collect()
+        kmsg_us = [group[-1].ts_usec - group[0].ts_usec for group in self.groups]
+        return user_us, total, kmsg_us
+
+    def run_keys(self, keys):
+        """Rows of insert, find and delete over keys, in their order"""
+        size = len(keys)
+        rows = []
+        self.backend.load(self.module_name)
+        try:
+            before = self.backend.slab_usage()
+            slab = (None, None)
+            for name, cmd in SCALING_OPS[self.module_type]:
+                user_us, total, kmsg_us = self.run_phase(cmd, keys)
+                if name == "insert":
+                    slab = slab_growth(before, self.backend.slab_usage())
+                stats = percentiles(user_us)
+                kmsg = percentiles(kmsg_us) if len(kmsg_us) == size else None
+                rows.append(
+                    {
+                        "op": name,
+                        "ops": size,
+                        "total_ms": round(total * 1000, 3),
+                        "ops_per_sec": round(size / total, 1) if total else "",
+                        "mean_us": round(stats["mean"], 2),
+                        "p50_us": round(stats["p50"], 2),
+                        "p95_us": round(stats["p95"], 2),
+                        "p99_us": round(stats["p99"], 2),
+                        "max_us": round(max(user_us), 2),
+                        "kmsg_p50_us": kmsg["p50"] if kmsg else "",
+                    }
+                )
+        finally:
+            self.backend.unload(self.module_name)
+        for row in rows:
+            row["slab_bytes"], row["slab_cache"] = slab
+        return rows
+
+
+def print_row(row):
+    if row["skipped"]:
+        print(
+            f"{row['module']:<12} {row['order']:<10} {row['size']:>7} "
+            f"{'-':<7} skipped: {row['skipped']}"
+        )
+        return
+    slab = "-" if row["slab_bytes"] is None else row["slab_bytes"]
+    print(
+        f"{row['module']:<12} {row['order']:<10} {row['size']:>7} {row['op']:<7} "
+        f"{row['height']:>7} {row['total_ms']:>11.1f} {row['p50_us']:>8.1f} "
+        f"{row['p99_us']:>8.1f} {slab:>10}"
+    )
+
+
+def run_scaling(backend, modules, sizes, orders, output, unsafe=False, seed=None):
+    """Time (module_type, module_name) pairs at every size and key order,
+    write one CSV row per command, 0 when every combination ran"""
+    if seed is None:
+        seed = random.randrange(2**32)
+    sizes = sizes or SCALING_SIZES
+    print(f"=== Tree scaling: sizes {sizes}, orders {orders}, seed {seed} ===")
+    print(
+        f"\n{'module':<12} {'order':<10} {'size':>7} {'op':<7} {'height':>7} "
+        f"{'total ms':>11} {'p50us':>8} {'p99us':>8} {'slab B':>10}"
+    )
+    skipped = 0
+    with open(output, "w", newline="") as f:
+        out = csv.DictWriter(f, COLUMNS, restval="")
+        out.writeheader()
+        for module_type, module_name in modules:
+            bench = ScalingBenchmark(backend, module_type, module_name, None)
+            for order in orders:
+                for size in sorted(sizes):
+                    # Same keys for both modules at a given order and size
+                    keys = key_order(
+                        order, size, random.Random(f"{seed}:{order}:{size}")
+                    )
+                    base = {"module": module_name, "order": order, "size": size}
+                    height = ""
+                    if module_type == "bin_tree":
+                        if order == "random":
+                            height = bst_height(
+                                keys, BIN_TREE_MAX_DEPTH - BIN_TREE_PRELOAD_DEPTH
+                            )
+                        else:
+                            # Every key hangs below the previous one
+                            height = size
+                        height = (
+                            f">{BIN_TREE_MAX_DEPTH}"
+                            if height is None
+                            else height + BIN_TREE_PRELOAD_DEPTH
+                        )
+                        if (
+                            isinstance(height, str) or height > BIN_TREE_MAX_DEPTH
+                        ) and not unsafe:
+                            row = dict(
+                                base,
+                                height=height,
+                                skipped=f"recursion deeper than {BIN_TREE_MAX_DEPTH} "
+                                "levels may overflow the kernel stack, --unsafe runs it",
+                            )
+                            out.writerow(row)
+                            print_row(row)
+                            skipped += 1
+                            continue
+                    for row in bench.run_keys(keys):
+                        row.update(base, height=height, skipped="")
+                        out.writerow(row)
+                        print_row(row)
+                    f.flush()
+            bench.kmsg.close()
+
+    print(f"\nRows written to {output}")
+    if skipped:
+        print(f"\nFINAL RESULT: {skipped} COMBINATIONS SKIPPED")
+    else:
+        print("\nFINAL RESULT: ALL COMBINATIONS MEASURED")
+    return 0
@@ -0,0 +1,989 @@
+#!/usr/bin/env python3
+import bisect
+import errno
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from .kmsg import KmsgReader, KmsgRecord, ModuleFilter
+
+# printk levels
+KERN_ERR = 3
+KERN_WARNING = 4
+KERN_INFO = 6
+# Level of a record started by pr_cont() (default_message_loglevel)
+KERN_DEFAULT = 4
+
+# Longest record text, longer pr_cont() output continues in a new record
+LOG_LINE_MAX = 992
+# Records kept in the simulated ring buffer
+LOG_BUF_RECORDS = 1 << 17
+# Buffer of a sysfs show() callback
+PAGE_SIZE = 4096
+# Longest state item with the newline and the terminating NUL
+STATE_ITEM_LEN = len(" -2147483648\n") + 1
+
+
+def _error(code):
+    return OSError(code, os.strerror(code))
+
+
+def s32(value):
+    """Wrap value like C int arithmetic"""
+    return (value + 2**31) % 2**32 - 2**31
+
+
+def kstrtoint(raw, unsigned=False):
+    """Parse parameter like kstrtoint()/kstrtouint() with base 0"""
+    text = raw[:-1] if raw.endswith("\n") else raw
+    match = re.fullmatch(r"([+-]?)(0[xX][0-9a-fA-F]+|0[0-7]*|[1-9][0-9]*)", text)
+    if not match or (unsigned and match.group(1) == "-"):
+        raise _error(errno.EINVAL)
+    digits = match.group(2)
+    if digits[:2].lower() == "0x":
+        value = int(digits, 16)
+    elif digits.startswith("0"):
+        value = int(digits, 8)
+    else:
+        value = int(digits)
+    if match.group(1) == "-":
+        value = -value
+    low, high = (0, 2**32 - 1) if unsigned else (-(2**31), 2**31 - 1)
+    if not low <= value <= high:
+        raise _error(errno.ERANGE)
+    return value
+
+
+def strstrip(raw):
+    """Kernel strstrip(): drop leading and trailing whitespace"""
+    return raw.strip(" \t\n\r\v\f")
+
+
+def param_set_charp(raw):
+    if len(raw) > 1024:
+        raise _error(errno.ENOSPC)
+    return raw
+
+
+class SimLog:
+    """In-memory kernel ring buffer producing kmsg-like records"""
+
+    def __init__(self):
+        self.records = []
+        self.first_seq = 0
+        self.cond = threading.Condition()
+        self.start = time.monotonic()
+
+    @property
+    def next_seq(self):
+        return self.first_seq + len(self.records)
+
+    def _ts_usec(self):
+        return int((time.monotonic() - self.start) * 1000000)
+
+    def printk(self, level, text, cont=False):
+        with self.cond:
+            self.records.append(
+                KmsgRecord(self.next_seq, level, self._ts_usec(), text, cont)
+            )
+            if len(self.records) > LOG_BUF_RECORDS:
+                # Oldest half is overwritten like in the real ring buffer
+                drop = LOG_BUF_RECORDS // 2
+                del self.records[:drop]
+                self.first_seq += drop
+            self.cond.notify_all()
+
+    def printk_cont(self, level, head, parts):
+        """pr_info(head) followed by pr_cont(part) for every part"""
+        line, cont = head, False
+        for part in parts:
+            if len(line) + len(part) > LOG_LINE_MAX:
+                self.printk(level, line, cont)
+                line, level, cont = part, KERN_DEFAULT, True
+            else:
+                line += part
+        self.printk(level, line, cont)
+
+
+class SimLogReader(KmsgReader):
+    """KmsgReader over SimLog, optionally limited to one module prefix"""
+
+    def __init__(self, log, prefix=None):
+        super().__init__(path=None)
+        self.log = log
+        self.filter = ModuleFilter(prefix) if prefix is not None else None
+        self.next_seq = log.first_seq
+
+    def read_available(self):
+        with self.log.cond:
+            start = max(self.next_seq, self.log.first_seq) - self.log.first_seq
+            new = self.log.records[start:]
+            self.next_seq = self.log.next_seq
+        if self.filter is None:
+            self._collect(new)
+            return new
+        pairs = self.filter(new)
+        new = [record for record, owned in pairs if owned]
+        self._collect(new, [record for record, _ in pairs])
+        return new
+
+    def clear(self):
+        with self.log.cond:
+            self.next_seq = self.log.next_seq
+        self.discard()
+
+    def _wait(self, timeout):
+        with self.log.cond:
+            if self.next_seq == self.log.next_seq:
+                self.log.cond.wait(timeout)
+
+    def close(self):
+        pass
+
+
+class SimLogDemux:
+    """Counterpart of KmsgDemux: every channel filters the shared SimLog"""
+
+    def __init__(self, log):
+        self.log = log
+
+    def channel(self, module_name):
+        return SimLogReader(self.log, prefix=f"{module_name}: ")
+
+    def pump(self):
+        pass
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SimModule:
+    """Simulated module: sysfs parameter callbacks and pr_*() output"""
+
+    params = ("cmd", "value")
+    # Message printed by the value setter ("Param <name> set to: %d")
+    value_name = "value"
+    commands = ""
+    control = ""
+    # Modules printing "Executing command: %s %d" before dispatch
+    trace_command = True
+
+    def __init__(self, name, log, rng, defines=None):
+        self.name = name
+        self.log = log
+        self.rng = rng
+        # Build time constants (make NAME=VALUE) override class defaults
+        for define, value in (defines or {}).items():
+            if hasattr(self, define):
+                setattr(self, define, value)
+        self.cmd = None
+        self.value = 0
+        self.state_start = 0
+        # kernel_param_lock(): stores to one module's parameters are serialized
+        self.param_lock = threading.Lock()
+        self.setup()
+        self.module_init()
+
+    def pr_info(self, text):
+        self.log.printk(KERN_INFO, f"{self.name}: {text}")
+
+    def pr_warn(self, text):
+        self.log.printk(KERN_WARNING, f"{self.name}: {text}")
+
+    def pr_err(self, text):
+        self.log.printk(KERN_ERR, f"{self.name}: {text}")
+
+    def pr_info_cont(self, head, values):
+        self.log.printk_cont(
+            KERN_INFO, f"{self.name}: {head}", [f" {v}" for v in values]
+        )
+
+    def setup(self):
+        pass
+
+    def on_load(self):
+        pass
+
+    def module_init(self):
+        self.pr_info(f"{self.name} module loaded")
+        self.on_load()
+        self.pr_info(f"Use echo 'cmd' > /sys/module/{self.name}/parameters/cmd")
+        if len(self.params) > 1:
+            param = self.params[1]
+            self.pr_info(
+                f"and echo '{param}' > /sys/module/{self.name}/parameters/{param}"
+            )
+        self.pr_info(f"to control the {self.control}")
+
+    def module_exit(self):
+        self.pr_info(f"{self.name} module unloaded")
+
+    def write_param(self, param, raw):
+        """sysfs store callback, raises OSError like write(2) would"""
+        if param not in self.params:
+            raise _error(errno.ENOENT)
+        with self.param_lock:
+            getattr(self, f"set_{param}")(raw)
+
+    def read_param(self, param):
+        """sysfs show callback, raises OSError like read(2) would"""
+        if param == "state" and "state_start" in self.params:
+            with self.param_lock:
+                return self.get_state()
+        if param not in self.params:
+            raise _error(errno.ENOENT)
+        with self.param_lock:
+            value = getattr(self, param)
+        return f"{'(null)' if value is None else value}\n"
+
+    def get_state(self):
+        """Item count, then items from state_start on, one page at most"""
+        items = list(self.state_items())
+        text = f"{len(items)}"
+        for item in items[self.state_start :]:
+            if PAGE_SIZE - len(text) < STATE_ITEM_LEN:
+                break
+            text += f" {item}"
+        return text + "\n"
+
+    def state_items(self):
+        """Items listed by the read-only state parameter"""
+        raise NotImplementedError
+
+    def set_state_start(self, raw):
+        # Plain module_param(), nothing is printed
+        self.state_start = kstrtoint(raw, unsigned=True)
+
+    def set_cmd(self, raw):
+        self.cmd = param_set_charp(strstrip(raw))
+        self.pr_info(f"Param cmd set to: {self.cmd}")
+        if self.trace_command:
+            self.pr_info(f"Executing command: {self.cmd} {self.value}")
+        self.process_command(self.cmd)
+
+    def set_value(self, raw):
+        self.value = kstrtoint(raw)
+        self.pr_info(f"Param {self.value_name} set to: {self.value}")
+
+    def unknown_command(self, cmd):
+        self.pr_info(f"Unknown command: {cmd}")
+        self.pr_info(f"Available commands: {self.commands}")
+
+    def process_command(self, cmd):
+        handler = getattr(self, f"do_{cmd}", None)
+        if handler is None:
+            self.unknown_command(cmd)
+        else:
+            handler()
+
+
+class SimList(SimModule):
+    params = ("cmd", "value", "state_start")
+    value_name = "val"
+    commands = "add, del, find, print, reverse, swap"
+    control = "list"
+
+    def setup(self):
+        self.items = []
+
+    def do_add(self):
+        self.items.append(self.value)
+        self.pr_info(f"Added item: {self.value}")
+
+    def do_find(self):
+        if self.value in self.items:
+            self.pr_info(f"Item {self.value} found in list")
+        else:
+            self.pr_info(f"Item {self.value} not found in list")
+
+    def do_del(self):
+        if self.value in self.items:
+            self.items.remove(self.value)
+            self.pr_info(f"Deleted item: {self.value}")
+        else:
+            self.pr_info(f"Item {self.value} not found in list")
+
+    def do_print(self):
+        if not self.items:
+            self.pr_info("List is empty")
+        else:
+            self.pr_info_cont("List contents:", self.items)
+
+    def state_items(self):
+        return self.items
+
+    def do_reverse(self):
+        self.items.reverse()
+        self.pr_info("List reversed")
+
+    def do_swap(self):
+        for i, item in enumerate(self.items[:-1]):
+            if item == self.value:
+                self.items[i], self.items[i + 1] = self.items[i + 1], item
+                self.pr_info(f"Swapped items: {self.items[i]} and {item}")
+                return
+        self.pr_info(f"Item {self.value} not found or is last in list")
+
+    def module_exit(self):
+        self.pr_info("Cleaning up list...")
+        super().module_exit()
+
+
+class SimQueue(SimModule):
+    params = ("cmd", "value", "state_start")
+    value_name = "val"
+    commands = "enqueue, dequeue, peek, print, total, clear"
+    control = "queue"
+    trace_command = False
+    MAX_QUEUE_SIZE = 32
+    # kfifo_alloc() takes element count but gets MAX_QUEUE_SIZE * sizeof(int)
+    capacity = MAX_QUEUE_SIZE * 4
+
+    def setup(self):
+        self.fifo = deque()
+        self.total = 0
+
+    def do_enqueue(self):
+        if len(self.fifo) >= self.capacity:
+            self.pr_err(
+                f"Queue max size {self.MAX_QUEUE_SIZE} reached! "
+                f"Cannot enqueue {self.value}"
+            )
+            return
+        self.fifo.append(self.value)
+        self.total = s32(self.total + self.value)
+        self.pr_info(f"Enqueued: {self.value}")
+
+    def do_dequeue(self):
+        if self.fifo:
+            val = self.fifo.popleft()
+            self.total = s32(self.total - val)
+            self.pr_info(f"Dequeued: {val}")
+        else:
+            self.pr_info("Queue is empty")
+
+    def do_peek(self):
+        if self.fifo:
+            self.pr_info(f"Front item: {self.fifo[0]}")
+        else:
+            self.pr_info("Queue is empty")
+
+    def do_print(self):
+        if not self.fifo:
+            self.pr_info("Queue is empty")
+        else:
+            self.pr_info_cont("Queue contents (front to back):", self.fifo)
+
+    def state_items(self):
+        return self.fifo
+
+    def do_total(self):
+        self.pr_info(f"Sum of values: {self.total}")
+
+    def do_clear(self):
+        # kfifo_reset() only, total is kept as in the module
+        self.fifo.clear()
+        self.pr_info("Queue cleared")
+
+
+class SimBitmap(SimModule):
+    params = ("cmd", "index")
+    commands = "set, clear, test, flip, find_set, find_zero,"
+    control = "bitmap"
+    MAX_BITS = 64
+
+    def setup(self):
+        self.bits = 0
+        self.index = 0
+
+    def set_index(self, raw):
+        self.index = kstrtoint(raw, unsigned=True)
+        self.pr_info(f"Param index set to: {self.index}")
+
+    def set_cmd(self, raw):
+        # Bitmap prints index instead of value
+        self.value = self.index
+        super().set_cmd(raw)
+
+    def unknown_command(self, cmd):
+        super().unknown_command(cmd)
+        self.pr_info("count, test_all_set, test_all_clear, print, clear_all, set_all")
+
+    def _index_ok(self):
+        if self.index >= self.MAX_BITS:
+            self.pr_err(f"Index {self.index} out of bounds (max {self.MAX_BITS - 1})")
+            return False
+        return True
+
+    def do_set(self):
+        if self._index_ok():
+            self.bits |= 1 << self.index
+            self.pr_info(f"Bit {self.index} set")
+
+    def do_clear(self):
+        if self._index_ok():
+            self.bits &= ~(1 << self.index)
+            self.pr_info(f"Bit {self.index} cleared")
+
+    def do_test(self):
+        if self._index_ok():
+            state = "set" if self.bits >> self.index & 1 else "not set"
+            self.pr_info(f"Bit {self.index} is {state}")
+
+    def do_flip(self):
+        if self._index_ok():
+            self.bits ^= 1 << self.index
+            self.pr_info(f"Bit {self.index} flipped")
+
+    def do_find_set(self):
+        if self.bits:
+            position = (self.bits & -self.bits).bit_length() - 1
+            self.pr_info(f"First set bit found at position {position}")
+        else:
+            self.pr_info("No set bits found")
+
+    def do_find_zero(self):
+        zeros = ~self.bits & ((1 << self.MAX_BITS) - 1)
+        if zeros:
+            position = (zeros & -zeros).bit_length() - 1
+            self.pr_info(f"First zero bit found at position {position}")
+        else:
+            self.pr_info("All bits are set")
+
+    def do_count(self):
+        self.pr_info(f"Number of set bits: {bin(self.bits).count('1')}")
+
+    def do_test_all_set(self):
+        if self.bits == (1 << self.MAX_BITS) - 1:
+            self.pr_info("All bits are set")
+        else:
+            self.pr_info("Not all bits are set")
+
+    def do_test_all_clear(self):
+        if self.bits == 0:
+            self.pr_info("All bits are clear")
+        else:
+            self.pr_info("Not all bits are clear")
+
+    def do_print(self):
+        image = format(self.bits, f"0{self.MAX_BITS}b")[::-1]
+        chunks = [image[i : i + 64] for i in range(0, len(image), 64)]
+        self.log.printk_cont(KERN_INFO, f"{self.name}: Current bitmap: ", chunks)
+
+    def do_clear_all(self):
+        self.bits = 0
+        self.pr_info("All bits cleared")
+
+    def do_set_all(self):
+        self.bits = (1 << self.MAX_BITS) - 1
+        self.pr_info("All bits set")
+
+
+class RBNode:
+    __slots__ = ("key", "red", "left", "right", "parent")
+
+    def __init__(self, key, red, nil):
+        self.key = key
+        self.red = red
+        self.left = self.right = self.parent = nil
+
+
+class RBTree:
+    """Red-black tree with the same rebalancing as lib/rbtree.c"""
+
+    def __init__(self):
+        self.nil = RBNode(None, False, None)
+        self.root = self.nil
+
+    def search(self, key):
+        node = self.root
+        while node is not self.nil and node.key != key:
+            node = node.left if key < node.key else node.right
+        return None if node is self.nil else node
+
+    def _rotate(self, x, left):
+        y = x.right if left else x.left
+        if left:
+            x.right = y.left
+            if y.left is not self.nil:
+                y.left.parent = x
+        else:
+            x.left = y.right
+            if y.right is not self.nil:
+                y.right.parent = x
+        y.parent = x.parent
+        if x.parent is self.nil:
+            self.root = y
+        elif x is x.parent.left:
+            x.parent.left = y
+        else:
+            x.parent.right = y
+        if left:
+            y.left = x
+        else:
+            y.right = x
+        x.parent = y
+
+    def insert(self, key):
+        """Insert key, return False for duplicate"""
+        parent, node = self.nil, self.root
+        while node is not self.nil:
+            if key == node.key:
+                return False
+            parent = node
+            node = node.left if key < node.key else node.right
+        z = RBNode(key, True, self.nil)
+        z.parent = parent
+        if parent is self.nil:
+            self.root = z
+        elif key < parent.key:
+            parent.left = z
+        else:
+            parent.right = z
+
+        while z.parent.red:
+            gparent = z.parent.parent
+            left = z.parent is gparent.left
+            uncle = gparent.right if left else gparent.left
+            if uncle.red:
+                z.parent.red = uncle.red = False
+                gparent.red = True
+                z = gparent
+                continue
+            if z is (z.parent.right if left else z.parent.left):
+                z = z.parent
+                self._rotate(z, left)
+            z.parent.red = False
+            gparent.red = True
+            self._rotate(gparent, not left)
+        self.root.red = False
+        return True
+
+    def _transplant(self, u, v):
+        if u.parent is self.nil:
+            self.root = v
+        elif u is u.parent.left:
+            u.parent.left = v
+        else:
+            u.parent.right = v
+        v.parent = u.parent
+
+    def delete(self, z):
+        y, y_red = z, z.red
+        if z.left is self.nil:
+            x = z.right
+            self._transplant(z, z.right)
+        elif z.right is self.nil:
+            x = z.left
+            self._transplant(z, z.left)
+        else:
+            # Successor takes place and color of the erased node
+            y = z.right
+            while y.left is not self.nil:
+                y = y.left
+            y_red = y.red
+            x = y.right
+            if y.parent is z:
+                x.parent = y
+            else:
+                self._transplant(y, y.right)
+                y.right = z.right
+                y.right.parent = y
+            self._transplant(z, y)
+            y.left = z.left
+            y.left.parent = y
+            y.red = z.red
+        if y_red:
+            return
+
+        while x is not self.root and not x.red:
+            left = x is x.parent.left
+            w = x.parent.right if left else x.parent.left
+            if w.red:
+                w.red = False
+                x.parent.red = True
+                self._rotate(x.parent, left)
+                w = x.parent.right if left else x.parent.left
+            near, far = (w.left, w.right) if left else (w.right, w.left)
+            if not near.red and not far.red:
+                w.red = True
+                x = x.parent
+                continue
+            if not far.red:
+                near.red = False
+                w.red = True
+                self._rotate(w, not left)
+                w = x.parent.right if left else x.parent.left
+                far = w.right if left else w.left
+            w.red = x.parent.red
+            x.parent.red = False
+            far.red = False
+            self._rotate(x.parent, left)
+            x = self.root
+        x.red = False
+
+    def __iter__(self):
+        stack, node = [], self.root
+        while stack or node is not self.nil:
+            while node is not self.nil:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    def clear(self):
+        self.root = self.nil
+
+
+class SimRBTree(SimModule):
+    params = ("cmd", "value", "state_start")
+    value_name = "val"
+    commands = "insert, delete, find, print, clear"
+    control = "rb_tree"
+
+    def setup(self):
+        self.tree = RBTree()
+
+    def do_insert(self):
+        if self.tree.insert(self.value):
+            self.pr_info(f"Inserted: {self.value}")
+        else:
+            self.pr_info(f"Insert failed, item {self.value} already exist in tree")
+
+    def do_delete(self):
+        node = self.tree.search(self.value)
+        if node is not None:
+            self.tree.delete(node)
+            self.pr_info(f"Deleted: {self.value}")
+
+    def do_find(self):
+        if self.tree.search(self.value) is not None:
+            self.pr_info(f"Found: {self.value}")
+        else:
+            self.pr_info(f"Not found: {self.value}")
+
+    def do_print(self):
+        if self.tree.root is self.tree.nil:
+            self.pr_info("Tree is empty")
+            return
+        self.pr_info("RB-Tree contents (in-order):")
+        for node in self.tree:
+            # The module tests rb_color bit 1 (RB_BLACK) but calls it red
+            self.pr_info(f"{node.key} ({'black' if node.red else 'red'})")
+
+    def state_items(self):
+        return (node.key for node in self.tree)
+
+    def do_clear(self):
+        self.tree.clear()
+        self.pr_info("Tree cleared")
+
+    def module_exit(self):
+        self.do_clear()
+        super().module_exit()
+
+
+class BSTNode:
+    __slots__ = ("data", "left", "right")
+
+    def __init__(self, data):
+        self.data = data
+        self.left = self.right = None
+
+
+class SimBinTree(SimModule):
+    params = ("cmd", "value", "state_start")
+    commands = "insert, delete, print"
+    control = "bin_tree"
+    init_values = (50, 30, 20, 40, 70, 60, 80)
+
+    def setup(self):
+        self.root = None
+
+    def on_load(self):
+        for data in self.init_values:
+            self._insert(data)
+
+    def _insert(self, data):
+        # Iterative form of the recursive insert_node()
+        link, node = None, self.root
+        while node is not None:
+            if data == node.data:
+                return
+            link = node
+            node = node.left if data < node.data else node.right
+        if link is None:
+            self.root = BSTNode(data)
+        elif data < link.data:
+            link.left = BSTNode(data)
+        else:
+            link.right = BSTNode(data)
+        self.pr_info(f"Inserted node: {data}")
+
+    def do_insert(self):
+        self._insert(self.value)
+
+    def do_delete(self):
+        data = self.value
+        parent, node = None, self.root
+        while node is not None and node.data != data:
+            parent = node
+            node = node.left if data < node.data else node.right
+        if node is None:
+            self.pr_info(f"Node {data} not found for deletion")
+            return
+
+        if node.left is None or node.right is None:
+            # delete_node() reports only the two children case
+            child = node.left if node.right is None else node.right
+            if parent is None:
+                self.root = child
+            elif parent.left is node:
+                parent.left = child
+            else:
+                parent.right = child
+            return
+
+        succ_parent, succ = node, node.right
+        while succ.left is not None:
+            succ_parent, succ = succ, succ.left
+        node.data = succ.data
+        if succ_parent is node:
+            succ_parent.right = succ.right
+        else:
+            succ_parent.left = succ.right
+        self.pr_info(f"Deleted node: {data}")
+
+    def in_order(self):
+        stack, node = [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.data
+            node = node.right
+
+    def do_print(self):
+        self.pr_info_cont("Tree in-order traversal:", self.in_order())
+
+    def state_items(self):
+        return self.in_order()
+
+
+class SimBinSearch(SimModule):
+    commands = "init, sort, search, print"
+    control = "binary search"
+    NR_VAL = 100
+
+    def setup(self):
+        self.arr = []
+        self.is_sorted = False
+
+    def on_load(self):
+        self.do_init()
+
+    def do_init(self):
+        self.arr = [self.rng.getrandbits(32) % self.NR_VAL for _ in range(self.NR_VAL)]
+        self.is_sorted = False
+        self.pr_info(f"Initialized array with {self.NR_VAL} random elements")
+
+    def do_sort(self):
+        self.arr.sort()
+        self.is_sorted = True
+        self.pr_info("Array sorted")
+
+    def do_print(self):
+        self.pr_info_cont(f"Current array ({self.NR_VAL} elements):", self.arr)
+        self.pr_info(f"Array is {'sorted' if self.is_sorted else 'NOT sorted'}")
+
+    def do_search(self):
+        if not self.is_sorted:
+            self.pr_info("Array not sorted, cannot perform binary search")
+            return
+        val = self.value % 2**32
+        i = bisect.bisect_left(self.arr, val)
+        if i < len(self.arr) and self.arr[i] == val:
+            self.pr_info(f"Value {val} found in array")
+        else:
+            self.pr_info(f"Value {val} not found in array")
+
+
+class SimStack(SimModule):
+    params = ("cmd", "value", "state_start")
+    commands = "push, pop, print, clear"
+    control = "stack"
+
+    def setup(self):
+        self.stack = []
+
+    def do_push(self):
+        self.stack.append(self.value)
+        self.pr_info(f"Pushed: {self.value}")
+
+    def do_pop(self):
+        if not self.stack:
+            self.pr_info("Stack underflow")
+            return
+        self.pr_info(f"Popped: {self.stack.pop()}")
+
+    def do_print(self):
+        if not self.stack:
+            self.pr_info("Stack is empty")
+        else:
+            self.pr_info_cont("Stack contents (top to bottom):", reversed(self.stack))
+
+    def state_items(self):
+        return reversed(self.stack)
+
+    def do_clear(self):
+        while self.stack:
+            self.do_pop()
+        self.pr_info("Stack cleared")
+
+    def module_exit(self):
+        self.do_clear()
+        super().module_exit()
+
+
+class SimStack2(SimStack):
+    params = ("cmd",)
+    commands = "push N, pop, top, size, clear"
+
+    def process_command(self, cmd):
+        match = re.match(r"push\s*([+-]?\d+)", cmd)
+        if match:
+            self.value = s32(int(match.group(1)))
+            self.do_push()
+        elif cmd == "pop":
+            self.do_pop()
+        elif cmd == "top":
+            if self.stack:
+                self.pr_info(f"Stack top: {self.stack[-1]}")
+            else:
+                self.pr_info("Stack is empty")
+        elif cmd == "size":
+            self.pr_info(f"Stack size: {len(self.stack)}")
+        elif cmd == "clear":
+            self.do_clear()
+        elif cmd == "exit":
+            self.pr_info("Exiting command processing")
+        else:
+            self.unknown_command(cmd)
+
+
+class SimBrackets(SimModule):
+    params = ("cmd", "input")
+    commands = "validate, clear"
+    control = "brackets check"
+    trace_command = False
+    pairs = {")": "(", "]": "[", "}": "{"}
+
+    def setup(self):
+        self.input = None
+
+    def set_input(self, raw):
+        self.input = param_set_charp(strstrip(raw))
+        self.pr_info(f"Param input set to: {self.input}")
+
+    def do_validate(self):
+        if self.input is None:
+            self.pr_info("No input string provided")
+            return
+        self.pr_info(f"Validating: {self.input}")
+        stack = []
+        for c in self.input:
+            if c in "([{":
+                stack.append(c)
+            elif c in self.pairs:
+                if not stack:
+                    self.pr_info("Result: INVALID (unmatched closing bracket)")
+                    return
+                top = stack.pop()
+                if top != self.pairs[c]:
+                    self.pr_info(f"Result: INVALID (mismatched brackets {top} and {c})")
+                    return
+        if stack:
+            self.pr_info("Result: INVALID (unmatched opening brackets)")
+        else:
+            self.pr_info("Result: VALID")
+
+    def do_clear(self):
+        self.pr_info("Stack cleared")
+
+
+MODULES = {
+    "ex_list": SimList,
+    "ex_queue": SimQueue,
+    "ex_bitmap": SimBitmap,
+    "ex_rb_tree": SimRBTree,
+    "ex_bin_tree": SimBinTree,
+    "ex_bin_search": SimBinSearch,
+    "ex_stack": SimStack,
+    "ex_stack2": SimStack2,
+    "ex_brackets": SimBrackets,
+}
+
+
+class SimulatedBackend:
+    """Pure-Python stand-in for the kernel, no root or .ko files needed"""
+
+    name = "sim"
+
+    def __init__(self, seed=None, defines=None):
+        self.log = SimLog()
+        self.rng = random.Random(seed)
+        self.defines = defines or {}
+        self.loaded = {}
+
+    def module_installed(self, module_name):
+        return module_name in MODULES
+
+    def module_digest(self, module_name):
+        """sha256 of the simulator source and build time constants"""
+        with open(__file__, "rb") as f:
+            h = hashlib.sha256(f.read())
+        h.update(repr(sorted(self.defines.items())).encode())
+        return h.hexdigest()
+
+    def load(self, module_name):
+        # modprobe of a loaded module is a no-op
+        if module_name not in self.loaded:
+            module = MODULES[module_name](module_name, self.log, self.rng, self.defines)
+            self.loaded[module_name] = module
+
+    def unload(self, module_name):
+        module = self.loaded.pop(module_name, None)
+        if module is None:
+            raise RuntimeError(f"rmmod: ERROR: Module {module_name} is not loaded")
+        module.module_exit()
+
+    def set_parameter(self, module_name, param, value):
+        module = self.loaded.get(module_name)
+        if module is None:
+            raise _error(errno.ENOENT)
+        module.write_param(param, f"{value}\n")
+
+    def get_parameter(self, module_name, param):
+        module = self.loaded.get(module_name)
+        if module is None:
+            raise _error(errno.ENOENT)
+        return module.read_param(param)
+
+    def slab_usage(self):
+        # Simulated modules allocate from the Python heap, no slab caches
+        return None
+
+    def open_log(self):
+        return SimLogReader(self.log)
+
+    def open_demux(self):
+        return SimLogDemux(self.log)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import csv
+import random
+import time
+
+from .benchmark import percentiles
+from .differential import QueueModel, format_op
+from .kmsg import split_commands
+
+# Operations issued between two reads of the log, keeps well below ring size
+CHUNK = 256
+# Fill level swings past capacity by this much to exercise the full fifo path
+OVERFILL = 16
+# Share of print and total among operations, the rest enqueue or dequeue
+PRINT_SHARE = 0.1
+TOTAL_SHARE = 0.1
+
+COLUMNS = [
+    "elapsed_s",
+    "ops",
+    "ops_per_sec",
+    "fill",
+    "overflows",
+    "log_records",
+    "log_bytes",
+    "p50_us",
+    "p95_us",
+    "p99_us",
+    "print_p50_us",
+    "mismatches",
+]
+
+
+def module_lines(group, prefix_len):
+    """Output lines of one command, continuation records joined back"""
+    lines = []
+    for record in group[1:]:
+        if record.cont and lines:
+            lines[-1] += record.text
+        else:
+            lines.append(record.text[prefix_len:])
+    return lines
+
+
+class QueueSoak:
+    """Long enqueue/dequeue/print/total run checked against QueueModel"""
+
+    def __init__(self, backend, module_name, rng, fill_period):
+        self.backend = backend
+        self.module_name = module_name
+        self.rng = rng
+        self.fill_period = fill_period
+        self.model = QueueModel()
+        self.kmsg = backend.open_log()
+        self.issued = []
+        self.last_value = None
+        self.reset_interval()
+        self.mismatches = 0
+
+    def reset_interval(self):
+        self.latencies = []
+        self.print_latencies = []
+        self.ops = 0
+        self.overflows = 0
+        self.log_records = 0
+        self.log_bytes = 0
+
+    def target_fill(self, elapsed):
+        """Triangle wave from empty to past capacity and back"""
+        phase = (elapsed / self.fill_period) % 1
+        return (1 - abs(2 * phase - 1)) * (self.model.capacity + OVERFILL)
+
+    def next_op(self, elapsed):
+        roll = self.rng.random()
+        if roll < PRINT_SHARE:
+            return "print", None
+        if roll < PRINT_SHARE + TOTAL_SHARE:
+            return "total", None
+        if len(self.model.fifo) < self.target_fill(elapsed):
+            return "enqueue", self.rng.randrange(1000)
+        return "dequeue", None
+
+    def issue(self, cmd, value):
+        if value is not None and value != self.last_value:
+            self.backend.set_parameter(self.module_name, "value", value)
+            self.last_value = value
+        start = time.perf_counter_ns()
+        self.backend.set_parameter(self.module_name, "cmd", cmd)
+        latency = (time.perf_counter_ns() - start) / 1000
+        self.latencies.append(latency)
+        if cmd == "print":
+            self.print_latencies.append(latency)
+        # Model runs ahead of the log so the fill level is always current
+        self.issued.append(((cmd, value), self.model.apply(cmd, value)))
+        self.ops += 1
+
+    def check(self):
+        """Compare output of issued commands with the model"""
+        groups = split_commands(self.kmsg.read_available(), self.module_name)
+        self.kmsg.discard()
+        if len(groups) != len(self.issued):
+            raise RuntimeError(
+                f"{len(self.issued)} commands issued, {len(groups)} logged, "
+                "records were lost"
+            )
+        prefix_len = len(self.module_name) + 2
+        for (op, expected), group in zip(self.issued, groups):
+            actual = module_lines(group, prefix_len)
+            if actual != expected:
+                self.mismatches += 1
+                if self.mismatches <= 10:
+                    print(f"[!] {format_op(op)}: expected {expected}, found {actual}")
+            self.overflows += sum("max size" in line for line in actual)
+            self.log_records += len(group)
+            self.log_bytes += sum(len(record.text) for record in group)
+        self.issued = []
+
+    def sample(self, elapsed, interval):
+        self.check()
+        latency = percentiles(self.latencies) or {}
+        prints = percentiles(self.print_latencies)
+        row = {
+            "elapsed_s": round(elapsed, 3),
+            "ops": self.ops,
+            "ops_per_sec": round(self.ops / interval, 1),
+            "fill": len(self.model.fifo),
+            "overflows": self.overflows,
+            "log_records": self.log_records,
+            "log_bytes": self.log_bytes,
+            "p50_us": round(latency.get("p50", 0), 1),
+            "p95_us": round(latency.get("p95", 0), 1),
+            "p99_us": round(latency.get("p99", 0), 1),
+            "print_p50_us": round(prints["p50"], 1) if prints else "",
+            "mismatches": self.mismatches,
+        }
+        self.reset_interval()
+        return row
+
+    def run(self, duration, rate, interval, writer):
+        self.backend.load(self.module_name)
+        try:
+            self.kmsg.clear()
+            start = time.monotonic()
+            next_op = last_sample = start
+            next_sample = start + interval
+            while True:
+                now = time.monotonic()
+                if now >= next_sample:
+                    row = self.sample(now - start, now - last_sample)
+                    writer(row)
+                    last_sample = now
+                    next_sample += interval
+                if now - start >= duration:
+                    break
+                if rate:
+                    # Keep the schedule, but never burst to make up a stall
+                    next_op = max(next_op + 1 / rate, now - 1)
+                    if next_op > now:
+                        time.sleep(next_op - now)
+                self.issue(*self.next_op(now - start))
+                if len(self.issued) >= CHUNK:
+                    self.check()
+            self.check()
+        finally:
+            self.backend.unload(self.module_name)
+        return self.mismatches
+
+
+def run_soak(backend, module_name, duration, rate, interval, output, seed=None):
+    """Soak the queue module, write a sample row every interval, 0 if all matched"""
+    if seed is None:
+        seed = random.randrange(2**32)
+    print(
+        f"=== Queue Soak {module_name}: {duration:g}s at "
+        f"{f'{rate:g}' if rate else 'max'} ops/s, sample every {interval:g}s, seed {seed} ==="
+    )
+    # A full empty-full-empty swing every 10 samples
+    soak = QueueSoak(backend, module_name, random.Random(seed), 10 * interval)
+    with open(output, "w", newline="") as f:
+        out = csv.DictWriter(f, COLUMNS)
+        out.writeheader()
+
+        def writer(row):
+            out.writerow(row)
+            f.flush()
+            print(
+                f"{row['elapsed_s']:>8.1f}s {row['ops_per_sec']:>9.0f} ops/s "
+                f"fill {row['fill']:>3} overflows {row['overflows']:>5} "
+                f"p99 {row['p99_us']:>7.1f}us"
+            )
+
+        mismatches = soak.run(duration, rate, interval, writer)
+
+    print(f"\nSamples written to {output}")
+    if mismatches == 0:
+        print("\nFINAL RESULT: SOAK MATCHED THE MODEL")
+        return 0
+    print(f"\nFINAL RESULT: {mismatches} COMMANDS DIVERGED FROM THE MODEL")
+    return 1
@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 from .base_tester import BaseModuleTester
-import time
+from .registry import register
 
 
+@register("stack2")
 class Stack2ModuleTester(BaseModuleTester):
+    RESET = ("clear", r"Stack cleared")
+
     def test_stack_operations(self):
         """Stack emulation tests"""
         print("\n=== Stack Emulation Tests ===")
-        self.clear_dmesg()
-        self.load_module()
+        self.setup_module()
 
         try:
             # 1. Тест базовых операций
@@ -26,33 +28,22 @@ class Stack2ModuleTester(BaseModuleTester):
                 ("exit", r"Exiting command processing"),
             ]
 
-            for cmd, pattern in test_sequence:
-                self.set_parameter("cmd", cmd)
-                time.sleep(0.1)
-                self.assert_dmesg_contains(pattern, f"Command: {cmd}")
+            with self.deferred():
+                for cmd, pattern in test_sequence:
+                    self.set_parameter("cmd", cmd)
+                    self.assert_dmesg_contains(pattern, f"Command: {cmd}")
 
             # 2. Тест обработки ошибок
             print("\n--- Error Handling ---")
             self.set_parameter("cmd", "top")
-            time.sleep(0.1)
             self.assert_dmesg_contains(r"Stack is empty", "Check top on empty stack")
 
             self.set_parameter("cmd", "invalid_cmd")
-            time.sleep(0.1)
             self.assert_dmesg_contains(r"Unknown command", "Check invalid command")
 
         finally:
-            self.unload_module()
+            self.teardown_module()
 
     def run_all_tests(self):
         """Execute all stack emulation tests"""
-        try:
-            self.test_module_lifecycle()
-            self.test_stack_operations()
-            return self.print_summary()
-        except Exception as e:
-            print(f"\n[!] Test error: {e}")
-            with open("dmesg_failure.log", "w") as f:
-                f.write(self.get_dmesg_output())
-            print("Debug info saved to dmesg_failure.log")
-            return 1
+        return self.run_suite(self.test_stack_operations)
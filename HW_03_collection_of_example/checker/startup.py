@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+TOP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports of a single suite run: entry point, then the tester it selects.
+# Modules loaded by the entry point alone are printed in between.
+PROBE = "import sys, checker.main; print(*sys.modules); import checker.{}_tester"
+# Checker modules only some modes need, importing them at startup is a regression
+LAZY_MODULES = [
+    "checker.benchmark",
+    "checker.differential",
+    "checker.helper",
+    "checker.plan_engine",
+    "checker.runner",
+    "checker.simulator",
+    "checker.tracing",
+]
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(module_type):
+    """(self us, cumulative us, depth, module) of every import of the probe,
+    and modules loaded before the tester"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module_type)],
+        cwd=TOP,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            imports.append((int(own), int(cumulative), len(indent) // 2, name))
+    return imports, set(result.stdout.split())
+
+
+def wall_time(argv, runs):
+    """Median wall time in ms of the checker started with argv"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "checker/main.py"] + argv,
+            cwd=TOP,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def report(module_type, runs, top):
+    """Print startup report, return import time in ms and needless modules"""
+    imports, loaded = importtime(module_type)
+    checker = [i for i in imports if i[3].startswith("checker")]
+    testers = sorted(
+        name
+        for name in loaded
+        if name.endswith("_tester") and name != "checker.base_tester"
+    )
+
+    print(f"=== Checker startup ({module_type} suite) ===")
+    print(
+        f"Process with --help:  {wall_time(['--help'], runs):.1f} ms (median of {runs})"
+    )
+    total = sum(i[0] for i in imports) / 1000
+    print(f"All imports:          {total:.1f} ms")
+    print(f"Checker modules:      {sum(i[0] for i in checker) / 1000:.1f} ms")
+    print(f"Testers at startup:   {', '.join(testers) or 'none'}")
+
+    print(f"\n{'self us':>8} {'cumul us':>9}  imported module (top {top})")
+    for own, cumulative, depth, name in sorted(imports, key=lambda i: -i[1])[:top]:
+        print(f"{own:>8} {cumulative:>9}  {'  ' * depth}{name}")
+
+    unexpected = [name for name in LAZY_MODULES if name in loaded]
+    unexpected += testers
+    return total, unexpected
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report checker startup time and the imports it pays for"
+    )
+    parser.add_argument(
+        "module_type",
+        nargs="?",
+        default="list",
+        help="Suite whose startup is measured (default: list)",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=10, help="Process starts timed (default: 10)"
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="Slowest imports listed (default: 15)"
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="Fail when imports of the suite take longer than this",
+    )
+    args = parser.parse_args()
+
+    total, unexpected = report(args.module_type, args.runs, args.top)
+    failed = False
+    if unexpected:
+        print(f"\n[!] Imported at startup but not needed: {', '.join(unexpected)}")
+        failed = True
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"\n[!] Imports take {total:.1f} ms, budget {args.budget_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+import os
+import re
+import time
+
+# Store callback of the cmd parameter, the same name in every module
+CMD_HANDLER = "param_set_cmd"
+# kprobe event group of the checker
+KPROBE_GROUP = "checker"
+TRACEFS_PATHS = ["/sys/kernel/tracing", "/sys/kernel/debug/tracing"]
+# function_graph output options, tail comments name the function closed by "}"
+GRAPH_OPTIONS = {
+    "funcgraph-cpu": 1,
+    "funcgraph-proc": 0,
+    "funcgraph-abstime": 0,
+    "funcgraph-duration": 1,
+    "funcgraph-tail": 1,
+}
+# Deadline for trace events of an issued command to show up in trace_pipe
+TRACE_TIMEOUT = 1.0
+
+# " 1) + 12.345 us   |    } /* process_command [ex_stack] */"
+GRAPH_RE = re.compile(r"^\s*(\d+)\)\s+(?:[+!#*@$]\s*)?(?:([\d.]+) us\s+)?\|\s?(.*)$")
+GRAPH_ENTRY_RE = re.compile(r"^\s*([\w.]+)(?: \[\w+\])?\(\)\s*([;{])")
+GRAPH_EXIT_RE = re.compile(r"^\s*\}(?: /\* ([\w.]+)(?: \[\w+\])? \*/)?")
+# Characters of symbol names that can't be in an event name
+EVENT_NAME_RE = re.compile(r"\W")
+# "python3-1234 [002] d..1. 5678.123456: stack_push_entry: (stack_push+0x0/0x30)"
+KPROBE_RE = re.compile(
+    r"^\s*.+?-(\d+)\s+\[\d+\]\s+(?:\S+\s+)?([\d.]+):\s+(\w+)_(entry|return):"
+)
+
+
+class Call:
+    """Function call traced in the module, with the calls it made"""
+
+    __slots__ = ("name", "duration", "children")
+
+    def __init__(self, name, duration=None):
+        self.name = name
+        # Inclusive time in microseconds
+        self.duration = duration
+        self.children = []
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def format_call(cmd, call):
+    if call is None:
+        return f"'{cmd}' not traced"
+    # Time spent per function under the handler, slowest first
+    totals = {}
+    for inner in call.walk():
+        if inner is not call and inner.duration is not None:
+            totals[inner.name] = totals.get(inner.name, 0) + inner.duration
+    inner = ", ".join(
+        f"{name} {duration:.3f} us"
+        for name, duration in sorted(totals.items(), key=lambda t: -t[1])[:4]
+    )
+    return f"'{cmd}' {call.duration:.3f} us" + (f" ({inner})" if inner else "")
+
+
+class TraceParser:
+    """Build call trees from function_graph or kprobe/kretprobe trace lines"""
+
+    def __init__(self):
+        # Open calls per CPU (function_graph) or per pid (kprobes)
+        self.stacks = {}
+
+    def feed(self, line):
+        """Parse one line, return a finished outermost call or None"""
+        match = GRAPH_RE.match(line)
+        if match:
+            return self._graph(*match.groups())
+        match = KPROBE_RE.match(line)
+        if match:
+            return self._kprobe(*match.groups())
+        return None
+
+    def _close(self, stack, name, duration):
+        # Missed exits (lost events) close the calls above the right one
+        while stack:
+            call = stack.pop()
+            if name is None or call.name == name:
+                call.duration = duration
+                return call if not stack else None
+        return None
+
+    def _open(self, stack, call):
+        if stack:
+            stack[-1].children.append(call)
+        stack.append(call)
+
+    def _graph(self, cpu, duration, text):
+        stack = self.stacks.setdefault(("cpu", cpu), [])
+        duration = float(duration) if duration else None
+        entry = GRAPH_ENTRY_RE.match(text)
+        if entry:
+            call = Call(entry.group(1), duration)
+            if entry.group(2) == ";":
+                # Leaf call, entry and exit on one line
+                if stack:
+                    stack[-1].children.append(call)
+                    return None
+                return call
+            self._open(stack, call)
+            return None
+        exit_ = GRAPH_EXIT_RE.match(text)
+        if exit_ and duration is not None:
+            return self._close(stack, exit_.group(1), duration)
+        return None
+
+    def _kprobe(self, pid, timestamp, name, kind):
+        stack = self.stacks.setdefault(("pid", pid), [])
+        timestamp = float(timestamp) * 1e6
+        if kind == "entry":
+            call = Call(name, timestamp)
+            self._open(stack, call)
+            return None
+        for open_call in reversed(stack):
+            if open_call.name == name:
+                return self._close(stack, name, timestamp - open_call.duration)
+        return None
+
+
+class TraceReader:
+    """Follow trace_pipe, or read a recorded trace, as outermost module calls"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        self.partial = b""
+        self.parser = TraceParser()
+        self.calls = []
+
+    def read_available(self):
+        """Parse all trace lines available now, never blocks"""
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        new = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            *lines, self.partial = (self.partial + data).split(b"\n")
+            for line in lines:
+                call = self.parser.feed(line.decode(errors="replace"))
+                if call is not None:
+                    new.append(call)
+        self.calls.extend(new)
+        return new
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def find_tracefs():
+    for path in TRACEFS_PATHS:
+        if os.path.exists(os.path.join(path, "trace_pipe")):
+            return path
+    raise RuntimeError(
+        "tracefs not mounted, try 'mount -t tracefs none /sys/kernel/tracing'"
+    )
+
+
+def module_functions(module_name):
+    """Text symbols of a loaded module from /proc/kallsyms"""
+    names = []
+    with open("/proc/kallsyms") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 4 and fields[3] == f"[{module_name}]":
+                if fields[1] in "tT" and not fields[2].startswith("__"):
+                    names.append(fields[2])
+    return names
+
+
+class ModuleTracer:
+    """In-kernel duration of every command store to one module.
+
+    Live tracing enables function_graph for the module's functions, or a
+    kprobe and a kretprobe on each of them, and streams trace_pipe. With
+    trace_file the calls come from a recorded trace instead, in order."""
+
+    def __init__(self, module_name, mode="function_graph", trace_file=None):
+        self.module_name = module_name
+        self.mode = mode
+        self.trace_file = trace_file
+        self.tracefs = None if trace_file else find_tracefs()
+        self.reader = TraceReader(trace_file) if trace_file else None
+        self.probes = []
+        # Commands issued and their traced handler calls, paired in order
+        self.pending = []
+        self.handlers = []
+        self.steps = []
+        # Value stored since the last cmd, shown with the command
+        self.value = None
+
+    def _write(self, name, value, mode="w"):
+        with open(os.path.join(self.tracefs, name), mode) as f:
+            f.write(f"{value}\n")
+
+    def attach(self):
+        """Start tracing the module, which has just been loaded"""
+        if self.trace_file:
+            return
+        self._write("tracing_on", 0)
+        self._write("current_tracer", "nop")
+        if self.mode == "function_graph":
+            self._write("set_ftrace_filter", f":mod:{self.module_name}")
+            for option, value in GRAPH_OPTIONS.items():
+                self._write(f"options/{option}", value)
+            self._write("current_tracer", "function_graph")
+        else:
+            try:
+                self._add_probes()
+            except OSError:
+                self._remove_probes()
+                raise
+            self._write(f"events/{KPROBE_GROUP}/enable", 1)
+        # Empty the ring buffer, then stream only what this load does
+        self._write("trace", "")
+        self.reader = TraceReader(os.path.join(self.tracefs, "trace_pipe"))
+        self._write("tracing_on", 1)
+
+    def _add_probes(self):
+        """kprobe and kretprobe on every module function"""
+        events = set()
+        for name in module_functions(self.module_name):
+            # Clones as process_command.constprop.0 or stack_pop.cold are
+            # probed under a name tracefs accepts and KPROBE_RE parses
+            event = EVENT_NAME_RE.sub("_", name)
+            if event in events:
+                continue
+            events.add(event)
+            for kind, probe in (("entry", "p"), ("return", "r")):
+                self._write(
+                    "kprobe_events",
+                    f"{probe}:{KPROBE_GROUP}/{event}_{kind} {self.module_name}:{name}",
+                    "a",
+                )
+                self.probes.append(f"{KPROBE_GROUP}/{event}_{kind}")
+
+    def _remove_probes(self):
+        if not self.probes:
+            return
+        self._write(f"events/{KPROBE_GROUP}/enable", 0)
+        for event in self.probes:
+            self._write("kprobe_events", f"-:{event}", "a")
+        self.probes = []
+
+    def detach(self):
+        """Stop tracing before the module is unloaded"""
+        self.collect()
+        if self.trace_file:
+            return
+        self._write("tracing_on", 0)
+        if self.mode == "function_graph":
+            self._write("current_tracer", "nop")
+            self._write("set_ftrace_filter", "")
+        else:
+            self._remove_probes()
+        self.reader.close()
+        self.reader = None
+
+    def collect(self):
+        if self.reader is not None:
+            for call in self.reader.read_available():
+                if call.name == CMD_HANDLER:
+                    self.handlers.append(call)
+
+    def expect(self, param, value):
+        """A parameter store was issued, cmd stores get timed"""
+        if param != "cmd":
+            self.value = value
+            return
+        label = str(value) if self.value is None else f"{value} {self.value}"
+        self.pending.append(label)
+        self.value = None
+
+    def take(self):
+        """(cmd, handler call or None) of commands issued since last take"""
+        deadline = time.monotonic() + (0 if self.trace_file else TRACE_TIMEOUT)
+        while True:
+            self.collect()
+            if len(self.handlers) >= len(self.pending):
+                break
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(0.01)
+        count = len(self.pending)
+        calls = self.handlers[:count]
+        calls += [None] * (count - len(calls))
+        taken = list(zip(self.pending, calls))
+        del self.handlers[:count]
+        self.pending = []
+        self.steps.append(taken)
+        return taken
+
+    def source(self):
+        """Where the calls come from, for reports"""
+        if self.trace_file:
+            return f"recorded trace {self.trace_file}"
+        return f"{self.mode} via {self.tracefs}"
+
+    def format_step(self, taken):
+        """One line on the in-kernel time of the commands of a test step"""
+        if len(taken) == 1:
+            return format_call(*taken[0])
+        traced = [(cmd, call) for cmd, call in taken if call is not None]
+        if not traced:
+            return f"{len(taken)} commands, none traced"
+        cmd, slowest = max(traced, key=lambda t: t[1].duration)
+        total = sum(call.duration for _, call in traced)
+        line = (
+            f"{len(taken)} commands, {total:.3f} us, "
+            f"slowest '{cmd}' {slowest.duration:.3f} us"
+        )
+        if len(traced) < len(taken):
+            line += f", {len(taken) - len(traced)} not traced"
+        return line
+
+    def function_totals(self):
+        """(function, calls, total us, max us) over all traced commands"""
+        stats = {}
+        for taken in self.steps:
+            for _, call in taken:
+                if call is None:
+                    continue
+                for inner in call.walk():
+                    if inner.duration is None:
+                        continue
+                    count, total, peak = stats.get(inner.name, (0, 0.0, 0.0))
+                    stats[inner.name] = (
+                        count + 1,
+                        total + inner.duration,
+                        max(peak, inner.duration),
+                    )
+        return sorted(
+            ((name, *values) for name, values in stats.items()), key=lambda s: -s[2]
+        )
+
+    def close(self):
+        if self.reader is None:
+            return
+        if self.trace_file:
+            self.reader.close()
+            self.reader = None
+        else:
+            self.detach()
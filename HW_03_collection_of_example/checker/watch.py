@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import ctypes
+import os
+import select
+import struct
+
+from .runner import run_parallel
+
+# inotify(7) flags
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+# struct inotify_event header: wd, mask, cookie, len; the name follows
+EVENT = struct.Struct("iIII")
+
+# Quiet time closing a burst of events, make install rewrites all modules
+DEBOUNCE = 0.3
+
+
+class Inotify:
+    """File names written or moved into watched directories, through libc"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch: {os.strerror(err)}", path)
+        self.dirs[wd] = path
+
+    def read(self, timeout=None):
+        """Paths of files changed, waits up to timeout (None: forever)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 65536)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            paths.append(os.path.join(self.dirs[wd], os.fsdecode(name)))
+        return paths
+
+    def wait_burst(self):
+        """Block until files change, return all paths changed in the burst"""
+        paths = set(self.read())
+        while True:
+            more = self.read(DEBOUNCE)
+            if not more:
+                return paths
+            paths.update(more)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def run_watch(backend, modules, make_tester, jobs, cache):
+    """Test modules ({module_name: module_type}), then re-test each module
+    whenever its binary changes, until interrupted"""
+    files = {backend.module_file(name): name for name in modules}
+    inotify = Inotify()
+    for path in sorted({os.path.dirname(path) for path in files}):
+        inotify.add_watch(path)
+
+    # Backend, log demux and helper connections stay up between runs
+    demux = backend.open_demux()
+    demux.start()
+    digests = {}
+    exit_code = 0
+    try:
+        changed = list(modules)
+        while True:
+            for name in changed:
+                digests[name] = backend.module_digest(name)
+            testers = [make_tester(modules[name]) for name in changed]
+            exit_code = run_parallel(
+                testers, jobs or len(testers), backend, cache, demux
+            )
+
+            print(f"\n[~] Watching {len(files)} modules, Ctrl-C to stop")
+            changed = []
+            while not changed:
+                paths = inotify.wait_burst()
+                for path in sorted(paths):
+                    name = files.get(path)
+                    if name is None or not os.path.exists(path):
+                        continue
+                    # Install rewrites unchanged modules too
+                    if backend.module_digest(name) != digests[name]:
+                        changed.append(name)
+            print(f"\n[~] Rebuilt: {', '.join(changed)}")
+    except KeyboardInterrupt:
+        print("\n[~] Watch stopped")
+    finally:
+        demux.close()
+        inotify.close()
+    return exit_code
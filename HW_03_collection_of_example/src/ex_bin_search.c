@@ -14,7 +14,10 @@ MODULE_LICENSE("GPL");
 MODULE_AUTHOR("Jack");
 MODULE_DESCRIPTION("Linux kernel module for binary search demonstration");
 
+// Array size, can be overridden at build time: make NR_VAL=10000
+#ifndef NR_VAL
 #define NR_VAL 100
+#endif
 
 static int search_value = 0;
 static char *cmd = NULL;
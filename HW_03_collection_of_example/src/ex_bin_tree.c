@@ -12,6 +12,10 @@ MODULE_DESCRIPTION("Linux kernel module for binary search tree operations");
 
 static char *cmd = NULL;
 static int value = 0;
+static unsigned int state_start = 0;
+
+// Longest item written to state, with the newline and the terminating NUL
+#define STATE_ITEM_LEN sizeof(" -2147483648\n")
 
 struct Node {
 	int data;
@@ -162,6 +166,40 @@ static int param_set_value(const char *val, const struct kernel_param *kp)
 	return ret;
 }
 
+static unsigned int count_nodes(struct Node *root)
+{
+	if (root == NULL)
+		return 0;
+	return count_nodes(root->left) + 1 + count_nodes(root->right);
+}
+
+// Append in-order items from state_start on, index counts visited nodes
+static int state_in_order(struct Node *root, char *buffer, int len,
+			  unsigned int *index)
+{
+	if (root == NULL)
+		return len;
+
+	len = state_in_order(root->left, buffer, len, index);
+	if ((*index)++ >= state_start && PAGE_SIZE - len >= STATE_ITEM_LEN)
+		len += scnprintf(buffer + len, PAGE_SIZE - len, " %d",
+				 root->data);
+	return state_in_order(root->right, buffer, len, index);
+}
+
+// Read tree state: node count, then nodes in order from state_start on
+static int param_get_state(char *buffer, const struct kernel_param *kp)
+{
+	unsigned int index = 0;
+	int len;
+
+	len = scnprintf(buffer, PAGE_SIZE, "%u", count_nodes(root));
+	len = state_in_order(root, buffer, len, &index);
+	len += scnprintf(buffer + len, PAGE_SIZE - len, "\n");
+
+	return len;
+}
+
 static const struct kernel_param_ops cmd_ops = { .set = param_set_cmd,
 						 .get = param_get_charp,
 						 .free = param_free_charp };
@@ -171,10 +209,19 @@ static const struct kernel_param_ops value_ops = {
 	.get = param_get_int,
 };
 
+static const struct kernel_param_ops state_ops = {
+	.get = param_get_state,
+};
+
 module_param_cb(cmd, &cmd_ops, &cmd, 0644);
 MODULE_PARM_DESC(cmd, "Tree commands: insert, delete, print");
 module_param_cb(value, &value_ops, &value, 0644);
 MODULE_PARM_DESC(value, "Value for tree operations");
+module_param_cb(state, &state_ops, NULL, 0444);
+MODULE_PARM_DESC(state, "Tree in order as '<count> <item>...' "
+			"from item state_start on (read-only)");
+module_param(state_start, uint, 0644);
+MODULE_PARM_DESC(state_start, "First tree item read from state");
 
 static int __init tree_module_init(void)
 {
@@ -10,7 +10,13 @@ MODULE_LICENSE("GPL");
 MODULE_AUTHOR("Jack");
 MODULE_DESCRIPTION("Linux kernel module for bitmap operations demonstration");
 
+// Bitmap size, can be overridden at build time: make MAX_BITS=4096
+#ifndef MAX_BITS
 #define MAX_BITS 64
+#endif
+
+// Bits printed per pr_cont() call
+#define PRINT_CHUNK 64
 
 static char *cmd = NULL;
 static unsigned int index = 0;
@@ -123,18 +129,21 @@ static void test_all_zeros(void)
 	}
 }
 
-// Print bitmap
+// Print bitmap in chunks, stack usage does not grow with MAX_BITS
 static void print_bitmap(void)
 {
-	char buf[MAX_BITS + 1] = { 0 };
-	unsigned int i;
-
-	for (i = 0; i < MAX_BITS; i++) {
-		buf[i] = test_bit(i, my_bitmap) ? '1' : '0';
+	char buf[PRINT_CHUNK + 1];
+	unsigned int i, j;
+
+	pr_info("Current bitmap: ");
+	for (i = 0; i < MAX_BITS; i += PRINT_CHUNK) {
+		for (j = 0; j < PRINT_CHUNK && i + j < MAX_BITS; j++) {
+			buf[j] = test_bit(i + j, my_bitmap) ? '1' : '0';
+		}
+		buf[j] = '\0';
+		pr_cont("%s", buf);
 	}
-	buf[MAX_BITS] = '\0';
-
-	pr_info("Current bitmap: %s\n", buf);
+	pr_cont("\n");
 }
 
 // Clear (zeroing) bitmap
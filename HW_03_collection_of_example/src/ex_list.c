@@ -15,6 +15,10 @@ MODULE_DESCRIPTION(
 
 static char *cmd = NULL;
 static int value = 0;
+static unsigned int state_start = 0;
+
+// Longest item written to state, with the newline and the terminating NUL
+#define STATE_ITEM_LEN sizeof(" -2147483648\n")
 
 struct my_data {
 	int data;
@@ -187,6 +191,32 @@ static int param_set_val(const char *val, const struct kernel_param *kp)
 	return 0;
 }
 
+// Read list state: item count, then items from state_start on, one page at most
+static int param_get_state(char *buffer, const struct kernel_param *kp)
+{
+	struct my_data *item;
+	unsigned int count = 0;
+	int len;
+
+	list_for_each_entry(item, &my_list, list) {
+		count++;
+	}
+
+	len = scnprintf(buffer, PAGE_SIZE, "%u", count);
+	count = 0;
+	list_for_each_entry(item, &my_list, list) {
+		if (count++ < state_start)
+			continue;
+		if (PAGE_SIZE - len < STATE_ITEM_LEN)
+			break;
+		len += scnprintf(buffer + len, PAGE_SIZE - len, " %d",
+				 item->data);
+	}
+	len += scnprintf(buffer + len, PAGE_SIZE - len, "\n");
+
+	return len;
+}
+
 static const struct kernel_param_ops cmd_ops = { .set = param_set_cmd,
 						 .get = param_get_charp,
 						 .free = param_free_charp };
@@ -196,11 +226,20 @@ static const struct kernel_param_ops value_ops = {
 	.get = param_get_int,
 };
 
+static const struct kernel_param_ops state_ops = {
+	.get = param_get_state,
+};
+
 // Register parameters with callbacks
 module_param_cb(cmd, &cmd_ops, &cmd, 0644);
 MODULE_PARM_DESC(cmd, "List commands: add, del, find, print, reverse, swap");
 module_param_cb(value, &value_ops, &value, 0644);
 MODULE_PARM_DESC(value, "Value for list operations");
+module_param_cb(state, &state_ops, NULL, 0444);
+MODULE_PARM_DESC(state, "List as '<count> <item>...' "
+			"from item state_start on (read-only)");
+module_param(state_start, uint, 0644);
+MODULE_PARM_DESC(state_start, "First list item read from state");
 
 // Module initialization
 static int __init list_module_init(void)
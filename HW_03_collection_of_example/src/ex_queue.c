@@ -13,6 +13,10 @@ MODULE_DESCRIPTION("Kernel module for FIFO queue operations");
 
 static char *cmd = NULL;
 static int value = 0;
+static unsigned int state_start = 0;
+
+// Longest item written to state, with the newline and the terminating NUL
+#define STATE_ITEM_LEN sizeof(" -2147483648\n")
 
 #define MAX_QUEUE_SIZE 32
 
@@ -156,6 +160,35 @@ static int param_set_val(const char *val, const struct kernel_param *kp)
 	return 0;
 }
 
+// Read queue state: item count, then items front to back from state_start on
+static int param_get_state(char *buffer, const struct kernel_param *kp)
+{
+	unsigned int count = kfifo_len(&my_queue.fifo);
+	unsigned int i;
+	int *items;
+	int len;
+
+	len = scnprintf(buffer, PAGE_SIZE, "%u", count);
+	if (state_start < count) {
+		items = kmalloc_array(count, sizeof(*items), GFP_KERNEL);
+		if (items == NULL)
+			return -ENOMEM;
+
+		// Copy of the items, unlike print_queue() none is taken out
+		count = kfifo_out_peek(&my_queue.fifo, items, count);
+		for (i = state_start; i < count; i++) {
+			if (PAGE_SIZE - len < STATE_ITEM_LEN)
+				break;
+			len += scnprintf(buffer + len, PAGE_SIZE - len, " %d",
+					 items[i]);
+		}
+		kfree(items);
+	}
+	len += scnprintf(buffer + len, PAGE_SIZE - len, "\n");
+
+	return len;
+}
+
 static const struct kernel_param_ops cmd_ops = { .set = param_set_cmd,
 						 .get = param_get_charp,
 						 .free = param_free_charp };
@@ -165,12 +198,21 @@ static const struct kernel_param_ops value_ops = {
 	.get = param_get_int,
 };
 
+static const struct kernel_param_ops state_ops = {
+	.get = param_get_state,
+};
+
 // Register parameters with callbacks
 module_param_cb(cmd, &cmd_ops, &cmd, 0644);
 MODULE_PARM_DESC(cmd,
 		 "Queue commands: enqueue, dequeue, peek, print, total, clear");
 module_param_cb(value, &value_ops, &value, 0644);
 MODULE_PARM_DESC(value, "Value for queue operations");
+module_param_cb(state, &state_ops, NULL, 0444);
+MODULE_PARM_DESC(state, "Queue front to back as '<count> <item>...' "
+			"from item state_start on (read-only)");
+module_param(state_start, uint, 0644);
+MODULE_PARM_DESC(state_start, "First queue item read from state");
 
 // Module initialization
 static int __init queue_module_init(void)
@@ -12,6 +12,10 @@ MODULE_DESCRIPTION("Kernel module for Red-Black Tree operations");
 
 static char *cmd = NULL;
 static int value = 0;
+static unsigned int state_start = 0;
+
+// Longest item written to state, with the newline and the terminating NUL
+#define STATE_ITEM_LEN sizeof(" -2147483648\n")
 
 struct my_data {
 	int data;
@@ -178,6 +182,33 @@ static int param_set_val(const char *val, const struct kernel_param *kp)
 	return 0;
 }
 
+// Read tree state: item count, then items in order from state_start on
+static int param_get_state(char *buffer, const struct kernel_param *kp)
+{
+	struct rb_node *node;
+	unsigned int count = 0;
+	int len;
+
+	for (node = rb_first(&my_tree); node; node = rb_next(node))
+		count++;
+
+	len = scnprintf(buffer, PAGE_SIZE, "%u", count);
+	count = 0;
+	for (node = rb_first(&my_tree); node; node = rb_next(node)) {
+		struct my_data *item = rb_entry(node, struct my_data, node);
+
+		if (count++ < state_start)
+			continue;
+		if (PAGE_SIZE - len < STATE_ITEM_LEN)
+			break;
+		len += scnprintf(buffer + len, PAGE_SIZE - len, " %d",
+				 item->data);
+	}
+	len += scnprintf(buffer + len, PAGE_SIZE - len, "\n");
+
+	return len;
+}
+
 static const struct kernel_param_ops cmd_ops = { .set = param_set_cmd,
 						 .get = param_get_charp,
 						 .free = param_free_charp };
@@ -187,11 +218,20 @@ static const struct kernel_param_ops value_ops = {
 	.get = param_get_int,
 };
 
+static const struct kernel_param_ops state_ops = {
+	.get = param_get_state,
+};
+
 // Register parameters with callbacks
 module_param_cb(cmd, &cmd_ops, &cmd, 0644);
 MODULE_PARM_DESC(cmd, "Command: insert, delete, find, print, clear");
 module_param_cb(value, &value_ops, &value, 0644);
 MODULE_PARM_DESC(value, "Value for rb_tree operations");
+module_param_cb(state, &state_ops, NULL, 0444);
+MODULE_PARM_DESC(state, "Tree in order as '<count> <item>...' "
+			"from item state_start on (read-only)");
+module_param(state_start, uint, 0644);
+MODULE_PARM_DESC(state_start, "First tree item read from state");
 
 static int __init tree_module_init(void)
 {
@@ -13,6 +13,10 @@ MODULE_DESCRIPTION("Linux kernel module for stack implementation");
 
 static char *cmd = NULL;
 static int value = 0;
+static unsigned int state_start = 0;
+
+// Longest item written to state, with the newline and the terminating NUL
+#define STATE_ITEM_LEN sizeof(" -2147483648\n")
 
 struct stack_entry {
 	int data;
@@ -132,6 +136,32 @@ static int param_set_value(const char *val, const struct kernel_param *kp)
 	return ret;
 }
 
+// Read stack state: item count, then items top to bottom from state_start on
+static int param_get_state(char *buffer, const struct kernel_param *kp)
+{
+	struct stack_entry *entry;
+	unsigned int count = 0;
+	int len;
+
+	list_for_each_entry(entry, &stack_top, list) {
+		count++;
+	}
+
+	len = scnprintf(buffer, PAGE_SIZE, "%u", count);
+	count = 0;
+	list_for_each_entry(entry, &stack_top, list) {
+		if (count++ < state_start)
+			continue;
+		if (PAGE_SIZE - len < STATE_ITEM_LEN)
+			break;
+		len += scnprintf(buffer + len, PAGE_SIZE - len, " %d",
+				 entry->data);
+	}
+	len += scnprintf(buffer + len, PAGE_SIZE - len, "\n");
+
+	return len;
+}
+
 static const struct kernel_param_ops cmd_ops = { .set = param_set_cmd,
 						 .get = param_get_charp,
 						 .free = param_free_charp };
@@ -141,11 +171,20 @@ static const struct kernel_param_ops value_ops = {
 	.get = param_get_int,
 };
 
+static const struct kernel_param_ops state_ops = {
+	.get = param_get_state,
+};
+
 // Register parameters with callbacks
 module_param_cb(cmd, &cmd_ops, &cmd, 0644);
 MODULE_PARM_DESC(cmd, "Stack commands: push, pop, print, clear");
 module_param_cb(value, &value_ops, &value, 0644);
 MODULE_PARM_DESC(value, "Value for stack operations");
+module_param_cb(state, &state_ops, NULL, 0444);
+MODULE_PARM_DESC(state, "Stack top to bottom as '<count> <item>...' "
+			"from item state_start on (read-only)");
+module_param(state_start, uint, 0644);
+MODULE_PARM_DESC(state_start, "First stack item read from state");
 
 // Module initialization
 static int __init stack_module_init(void)